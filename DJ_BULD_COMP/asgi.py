@@ -3,6 +3,16 @@ ASGI config for DJ_BULD_COMP project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Запуск в режиме ASGI (сервис web-asgi в docker-compose):
+
+    uvicorn DJ_BULD_COMP.asgi:application --host 0.0.0.0 --port 8001
+
+В этом режиме async-представления (/api/async/...: вход, check-login,
+списки и listWTT) обслуживаются в цикле событий, и один процесс держит
+много медленных соединений без отдельного потока на каждое. Остальные
+(синхронные) представления Django выполняет в пуле потоков. Число
+процессов задаётся --workers; для общего кеша между ними нужен REDIS_URL.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
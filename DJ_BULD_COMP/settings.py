@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+from datetime import time
 from pathlib import Path
 
+import django
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -51,12 +55,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    'api.instrumentation.InstrumentationMiddleware',
+    'api.ratelimit.RateLimitMiddleware',
     "django.middleware.common.CommonMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.routing.ReadPreferenceMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -84,13 +91,164 @@ WSGI_APPLICATION = 'DJ_BULD_COMP.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# По умолчанию SQLite; DB_ENGINE=postgres переключает на PostgreSQL
+# (POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST, POSTGRES_PORT).
+# DB_POOL=1 включает пул соединений psycopg (Django 5.1+, пакет psycopg[pool]),
+# иначе соединения переиспользуются в течение DB_CONN_MAX_AGE секунд
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+# Ожидание блокировки записи SQLite (секунды) и настройки соединения (api/db.py)
+SQLITE_TIMEOUT = 5
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': SQLITE_TIMEOUT * 1000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,  # в КиБ
+    'temp_store': 'MEMORY',
+}
+
+# Повторы записи при «database is locked»: число и начальная пауза (секунды)
+DB_LOCK_RETRIES = 3
+DB_LOCK_RETRY_DELAY = 0.05
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'building_company'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_POOL') == '1':
+        # С пулом постоянные соединения Django не используются
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': SQLITE_TIMEOUT,
+            },
+        }
     }
+    if django.VERSION >= (5, 1):
+        # Транзакция сразу берёт блокировку записи: без взаимоблокировки
+        # при повышении блокировки, которую busy_timeout не разрешает
+        DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+
+# Реплика для чтения (api/routing.py): SQLITE_REPLICA_PATH — копия файла SQLite,
+# которую обновляет manage.py sync_replica; POSTGRES_REPLICA_HOST — реплика Postgres.
+# Без них всё читается с основной БД
+REPLICA_DB_ALIAS = 'replica'
+# Допустимое отставание реплики (секунды) и как часто его проверять
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))
+REPLICA_LAG_CHECK_INTERVAL = 1
+# После изменения клиент читает с основной БД столько секунд (чтение своих записей)
+REPLICA_PIN_COOKIE = 'db_pin'
+REPLICA_PIN_SECONDS = 10
+
+if DB_ENGINE == 'postgres' and os.environ.get('POSTGRES_REPLICA_HOST'):
+    DATABASES[REPLICA_DB_ALIAS] = dict(
+        DATABASES['default'],
+        HOST=os.environ['POSTGRES_REPLICA_HOST'],
+        PORT=os.environ.get('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+        OPTIONS=dict(DATABASES['default']['OPTIONS']),
+        TEST={'MIRROR': 'default'},
+    )
+elif DB_ENGINE != 'postgres' and os.environ.get('SQLITE_REPLICA_PATH'):
+    DATABASES[REPLICA_DB_ALIAS] = dict(
+        DATABASES['default'],
+        NAME=os.environ['SQLITE_REPLICA_PATH'],
+        OPTIONS=dict(DATABASES['default']['OPTIONS']),
+        TEST={'MIRROR': 'default'},
+    )
+
+DATABASE_ROUTERS = ['api.routing.ReadReplicaRouter']
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    # Пагинация включается параметром ?page_size= или ?cursor= (см. api/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.OptInCursorPagination',
+    # Те же рендереры DRF с замером времени отрисовки (см. api/instrumentation.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.instrumentation.JSONRenderer',
+        'api.instrumentation.BrowsableAPIRenderer',
+    ],
 }
 
+# Размер порции строк при потоковой выдаче списков (?stream=1)
+STREAM_CHUNK_SIZE = 500
+
+# Отчёт по часам: начало рабочего дня (позже — опоздание)
+# и время хранения отчётов за закрытые периоды (секунды)
+WORK_DAY_START = time(9, 0)
+REPORT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Предел событий в одном пакете синхронизации отметок (api/wtt/sync/)
+CLOCK_SYNC_MAX_EVENTS = 10000
+
+# Выгрузки (табель): каталог файлов и предел строк для выгрузки прямо в ответ.
+# Фоновые выгрузки выполняет manage.py run_exports; выгрузка, которая идёт
+# дольше EXPORT_JOB_TIMEOUT секунд, считается прерванной
+EXPORT_ROOT = BASE_DIR / 'exports'
+EXPORT_SYNC_ROW_LIMIT = 5000
+EXPORT_JOB_TIMEOUT = 60 * 60
+
+# Приём заявок с сайта: direct — сразу в БД, buffered — в очередь на диске
+# (каталог INTAKE_SPOOL_DIR), которую переносит в БД manage.py flush_intake.
+# Повтор заявки с тем же телефоном и текстом за INTAKE_DEDUPE_WINDOW секунд отбрасывается
+APPLICATION_INTAKE_MODE = os.environ.get('APPLICATION_INTAKE_MODE', 'direct')
+INTAKE_SPOOL_DIR = os.environ.get('INTAKE_SPOOL_DIR', BASE_DIR / 'intake')
+INTAKE_BATCH_SIZE = 500
+INTAKE_DEDUPE_WINDOW = 10 * 60
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Для нескольких процессов нужен общий кеш (REDIS_URL, задан в docker-compose.yml),
+# иначе сбросы по сигналам видны только внутри процесса. LocMemCache — только
+# для запуска в одном процессе (runserver, тесты)
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Время жизни закешированного пользователя сессии (секунды)
+PRINCIPAL_CACHE_TIMEOUT = 60
+# Справочники в памяти процесса (api/lookups.py) перечитываются не реже,
+# чем раз в столько секунд, даже если сброс версии не дошёл
+LOOKUP_MAX_AGE = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -111,6 +269,83 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+
+# Режим хранения сессий (в сессии только user_id):
+#   db     — таблица django_session (по умолчанию)
+#   cache  — кеш, без обращений к БД
+#   signed — подписанная cookie без состояния на сервере
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db')
+
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+
+# Список отозванных при выходе сессий (в кеше, на время жизни сессии)
+SESSION_REVOCATION = True
+
+
+# Асинхронный вход (api/async/login/): размер пула для проверки паролей,
+# сколько проверок может ждать в очереди и Retry-After при перегрузке (секунды)
+LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', 4))
+LOGIN_HASH_QUEUE_SIZE = int(os.environ.get('LOGIN_HASH_QUEUE_SIZE', 16))
+LOGIN_RETRY_AFTER = 2
+
+
+# Ограничение частоты запросов к открытым точкам (api/ratelimit.py).
+# Для правила: путь, методы и вёдра (ёмкость, за сколько секунд восполняется):
+# ip — на адрес клиента, total — общее на точку
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+# Брать адрес клиента из X-Forwarded-For (только за своим прокси)
+RATE_LIMIT_TRUST_FORWARDED = os.environ.get('RATE_LIMIT_TRUST_FORWARDED') == '1'
+
+RATE_LIMITS = {
+    'login': {
+        'path': '/api/login/',
+        'methods': ['POST'],
+        'ip': (10, 60),
+        'total': (300, 60),
+    },
+    'async_login': {
+        'path': '/api/async/login/',
+        'methods': ['POST'],
+        'ip': (10, 60),
+        'total': (300, 60),
+    },
+    'applications': {
+        'path': '/api/applications/',
+        'methods': ['POST'],
+        'ip': (5, 60),
+        'total': (1200, 60),
+    },
+}
+
+
+# Замеры запросов (api/instrumentation.py): число SQL-запросов и время
+# в БД, сериализаторах и отрисовке — в заголовке Server-Timing и в логе
+# api.instrumentation. Превышение query_budget представления — только
+# предупреждение в логе; бюджеты проверяются тестами (api/tests.py)
+INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', '1') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.instrumentation': {
+            'handlers': ['console'],
+            'level': os.environ.get('INSTRUMENTATION_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import db, signals  # noqa: F401
+        from .instrumentation import install
+        from .permissions import build_registry
+        build_registry()
+        install()
@@ -0,0 +1,198 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+
+from .filters import filter_work_time_list, DATE_FORMAT_ERROR
+from .instrumentation import timed
+from .models import CustomUser, WorkTimeTracking
+from .permissions import registry
+from .principal import aget_principal
+from .serializers import work_time_list_values
+from .sessions import astart_session
+from .streaming import StreamingJSONResponse, aiterate_queryset
+
+
+##### ASYNC (ASGI) #####
+
+### СЛУЖЕБНОЕ ###
+
+# Проверка пароля (PBKDF2) выполняется в отдельном ограниченном пуле,
+# чтобы не блокировать обработчики запросов
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.LOGIN_HASH_WORKERS,
+    thread_name_prefix='login-hash',
+)
+# Сколько проверок может выполняться и ждать в пуле одновременно
+_hash_slots = threading.BoundedSemaphore(
+    settings.LOGIN_HASH_WORKERS + settings.LOGIN_HASH_QUEUE_SIZE
+)
+
+async def check_password_offloaded(user, raw_password):
+    """Проверка пароля в пуле; None — если пул перегружен."""
+    if not _hash_slots.acquire(blocking=False):
+        return None
+    try:
+        loop = asyncio.get_running_loop()
+        is_valid, rehashed = await loop.run_in_executor(_hash_executor, user.verify_password, raw_password)
+    finally:
+        _hash_slots.release()
+    # Новый хеш сохраняется не из пула: Django не закрывает соединения
+    # его потоков, и с DB_POOL каждый поток навсегда занял бы соединение
+    if rehashed:
+        await user.asave(update_fields=['_password'])
+    return is_valid
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+    return request.POST
+
+
+# Вход в систему (async)
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncLoginView(View):
+    http_method_names = ['post']
+
+    async def post(self, request):
+        data = _request_data(request)
+        login = data.get('login')
+        password = data.get('password')
+
+        try:
+            user = await CustomUser.objects.aget(login=login)
+        except CustomUser.DoesNotExist:
+            return JsonResponse({'error': 'User not found'}, status=401)
+
+        is_valid = await check_password_offloaded(user, password)
+        if is_valid is None:
+            response = JsonResponse({'error': 'Сервер перегружен, повторите попытку'}, status=503)
+            response['Retry-After'] = str(settings.LOGIN_RETRY_AFTER)
+            return response
+        if not is_valid:
+            return JsonResponse({'error': 'Wrong password'}, status=401)
+
+        await astart_session(request, user)
+        return JsonResponse({'status': 'Success'})
+
+
+### ЧТЕНИЕ ###
+
+# Ответ в том же виде, что у DRF (компактный JSON, кириллица без экранирования)
+def api_response(data, status=200):
+    with timed('render_time'):
+        return JsonResponse(
+            data, status=status, safe=False, encoder=JSONEncoder,
+            json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+        )
+
+def stream_requested(request):
+    return request.GET.get('stream') in ('1', 'true')
+
+
+# Базовое async-представление для чтения. Доступ проверяется по матрице ролей
+# того же синхронного представления (permission_view, permission_action)
+class AsyncReadView(View):
+    http_method_names = ['get']
+    permission_view = None
+    permission_action = 'get'
+
+    async def get(self, request, *args, **kwargs):
+        user = await aget_principal(request)
+        if user is None:
+            return api_response({'detail': 'Not authenticated'}, status=403)
+
+        if self.permission_view:
+            role = user.role.name if user.role else None
+            if not registry.is_allowed(role, self.permission_view, self.permission_action):
+                return api_response({'detail': 'You do not have permission to perform this action.'}, status=403)
+
+        request.my_user = user
+        return await self.respond(request, *args, **kwargs)
+
+# Ответ о логине для фронта (async)
+class AsyncCheckLoginView(AsyncReadView):
+    async def respond(self, request):
+        return api_response({'logged_in': True})
+
+# Список ViewSet (async), права действия list. Queryset, фильтры и пагинация —
+# самого ViewSet (get_queryset, filter_queryset, paginator): они могут обращаться
+# к БД, поэтому выполняются в потоке, а обход списка без страниц — асинхронно
+class AsyncListView(AsyncReadView):
+    viewset = None
+    permission_action = 'list'
+    read_preference = 'replica'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.permission_view = self.viewset.__name__
+
+    def get_viewset(self, request):
+        return self.viewset(
+            request=Request(request), args=(), kwargs={},
+            format_kwarg=None, action='list',
+        )
+
+    # Queryset и, если клиент запросил страницу, готовый ответ со страницей
+    @staticmethod
+    def prepare(viewset, stream):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        page = None if stream else viewset.paginate_queryset(queryset)
+        if page is None:
+            return queryset, None
+        with timed('serializer_time'):
+            serializer = viewset.get_serializer(page, many=True)
+            return queryset, viewset.get_paginated_response(serializer.data).data
+
+    async def respond(self, request):
+        viewset = self.get_viewset(request)
+        stream = stream_requested(request)
+        try:
+            queryset, page = await sync_to_async(self.prepare)(viewset, stream)
+        except ValueError:
+            return api_response({'error': DATE_FORMAT_ERROR}, status=400)
+        if page is not None:
+            return api_response(page)
+
+        serializer_class = viewset.get_serializer_class()
+        context = viewset.get_serializer_context()
+        if stream:
+            async def items():
+                async for obj in aiterate_queryset(queryset):
+                    yield serializer_class(obj, context=context).data
+            return StreamingJSONResponse(items())
+
+        objects = [obj async for obj in queryset]
+        with timed('serializer_time'):
+            data = serializer_class(objects, many=True, context=context).data
+        return api_response(data)
+
+# Список учёта времени (async), те же фильтры, что у api/wtt/listWTT/
+class AsyncListWorkTimeTrackingView(AsyncReadView):
+    permission_view = 'ListWorkTimeTrackingAPIView'
+    read_preference = 'replica'
+    query_budget = 3
+
+    async def respond(self, request):
+        try:
+            queryset = filter_work_time_list(WorkTimeTracking.objects.all(), request.GET)
+        except ValueError:
+            return api_response({'error': DATE_FORMAT_ERROR}, status=400)
+
+        rows = work_time_list_values(queryset.order_by('id'))
+        if stream_requested(request):
+            return StreamingJSONResponse(aiterate_queryset(rows))
+        return api_response([row async for row in rows])
@@ -0,0 +1,37 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+
+# Версии данных в общем кеше.
+# Начальное значение — метка времени, чтобы после очистки кеша
+# новая версия не совпала со старой
+def get_version(name):
+    return get_version_info(name)[0]
+
+# Версия и время последнего изменения (unix time)
+def get_version_info(name):
+    version_key, modified_key = f'version:{name}', f'modified:{name}'
+    values = cache.get_many([version_key, modified_key])
+    if version_key not in values:
+        cache.add(version_key, time.time_ns(), timeout=None)
+        cache.add(modified_key, time.time(), timeout=None)
+        values = cache.get_many([version_key, modified_key])
+    return values.get(version_key), values.get(modified_key, time.time())
+
+async def aget_version(name):
+    version = await cache.aget(f'version:{name}')
+    if version is None:
+        return await sync_to_async(get_version)(name)
+    return version
+
+def bump_version(name):
+    key = f'version:{name}'
+    cache.set(f'modified:{name}', time.time(), timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, timeout=None)
+        return version
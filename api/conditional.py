@@ -0,0 +1,53 @@
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import get_version_info
+from .routing import fresh_reads
+
+
+# Версия таблицы модели: сбрасывается сигналами при любом изменении строк
+def table_version_name(model):
+    return model._meta.db_table
+
+
+# Условный GET для справочников: ETag и Last-Modified строятся по версии
+# таблицы, при совпадении ответ 304 без запросов к таблице и сериализации
+class ConditionalGetMixin:
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def _conditional_response(self, handler, request, *args, **kwargs):
+        name = table_version_name(self.queryset.model)
+        version, modified = get_version_info(name)
+        etag = f'"{name}-{version}"'
+        last_modified = int(modified)
+
+        if self._not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            # Тело должно быть не старше версии в ETag
+            with fresh_reads(modified):
+                response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Cookie'])
+        return response
+
+    @staticmethod
+    def _not_modified(request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag in etags or etag in [tag.removeprefix('W/') for tag in etags]
+
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return if_modified_since is not None and last_modified <= if_modified_since
@@ -0,0 +1,52 @@
+import functools
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Сообщения SQLite о занятой блокировке записи
+LOCKED_ERRORS = ('database is locked', 'database table is locked')
+
+
+# Настройки SQLite для каждого нового соединения (settings.SQLITE_PRAGMAS):
+# WAL — чтение не блокируется записью, busy_timeout — ожидание блокировки
+# вместо немедленной ошибки, mmap_size и cache_size — меньше чтений с диска
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked_error(error):
+    message = str(error).lower()
+    return any(text in message for text in LOCKED_ERRORS)
+
+# Повтор записи, если SQLite вернул «database is locked» после busy_timeout.
+# Паузы растут экспоненциально со случайным разбросом; внутри открытой
+# транзакции не повторяем — повторять нужно всю внешнюю транзакцию
+def retry_on_locked(func=None, *, using='default'):
+    if func is None:
+        return functools.partial(retry_on_locked, using=using)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        attempts = settings.DB_LOCK_RETRIES
+        for attempt in range(attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if (
+                    attempt == attempts
+                    or not is_locked_error(error)
+                    or connections[using].in_atomic_block
+                ):
+                    raise
+                delay = settings.DB_LOCK_RETRY_DELAY * 2 ** attempt
+                time.sleep(delay + random.uniform(0, delay))
+    return wrapper
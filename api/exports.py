@@ -0,0 +1,159 @@
+import csv
+from datetime import datetime, timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .filters import filter_work_time
+from .models import ExportJob, WorkTimeTracking
+from .serializers import work_time_list_values
+from .streaming import iterate_queryset
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+# Колонки табеля: поле строки -> заголовок
+TIMESHEET_COLUMNS = [
+    ('date', 'Дата'),
+    ('personnelNumber', 'Табельный номер'),
+    ('fullName', 'ФИО'),
+    ('jobTitle', 'Должность'),
+    ('object', 'Объект'),
+    ('startTime', 'Начало'),
+    ('endTime', 'Конец'),
+    ('hours', 'Часы'),
+]
+
+
+def xlsx_available():
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+### ТАБЕЛЬ ###
+
+def _hours(row):
+    if not row['endTime']:
+        return None
+    start = datetime.combine(row['date'], row['startTime'])
+    end = datetime.combine(row['date'], row['endTime'])
+    return round((end - start).total_seconds() / 3600, 2)
+
+def timesheet_queryset(params):
+    queryset = filter_work_time(WorkTimeTracking.objects.all(), params)
+    return work_time_list_values(queryset).order_by('date', 'employee__fullName', 'id')
+
+# Строки табеля (без заголовка), читаются из БД порциями
+def timesheet_rows(params):
+    for row in iterate_queryset(timesheet_queryset(params)):
+        row['hours'] = _hours(row)
+        yield [row[key] for key, _ in TIMESHEET_COLUMNS]
+
+def timesheet_header():
+    return [title for _, title in TIMESHEET_COLUMNS]
+
+
+### ФОРМАТЫ ###
+
+# Псевдо-файл для csv.writer: возвращает строку вместо записи
+class _Echo:
+    def write(self, value):
+        return value
+
+# CSV отдаётся потоком прямо в ответ (BOM — для корректного открытия в Excel)
+def csv_streaming_response(header, rows, filename):
+    writer = csv.writer(_Echo())
+    content = chain(['\ufeff'], (writer.writerow(row) for row in chain([header], rows)))
+    response = StreamingHttpResponse(content, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def write_csv(path, header, rows):
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8-sig') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+def write_xlsx(path, header, rows):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    workbook.save(path)
+    return count
+
+WRITERS = {
+    'csv': write_csv,
+    'xlsx': write_xlsx,
+}
+
+# Виды выгрузок: заголовок и строки по параметрам запроса
+EXPORTS = {
+    'timesheet': (timesheet_header, timesheet_rows),
+}
+
+
+### ФОНОВЫЕ ВЫГРУЗКИ ###
+
+# Выгрузка создаётся в БД со статусом pending, выполняет её
+# обработчик manage.py run_exports (отдельный процесс, не веб-воркер)
+def start_export_job(kind, export_format, params, user=None):
+    return ExportJob.objects.create(kind=kind, format=export_format, params=params, user=user)
+
+# Следующая выгрузка из очереди. Статус меняется одним UPDATE
+# с условием status=pending, поэтому обработчиков может быть несколько
+def claim_export_job():
+    pending = ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).order_by('id')
+    for job_id in pending.values_list('id', flat=True)[:10]:
+        claimed = ExportJob.objects.filter(id=job_id, status=ExportJob.STATUS_PENDING).update(
+            status=ExportJob.STATUS_RUNNING, started=timezone.now(),
+        )
+        if claimed:
+            return job_id
+    return None
+
+# Выгрузки, которые выполняются дольше EXPORT_JOB_TIMEOUT, считаются
+# прерванными (обработчик перезапущен или упал) и помечаются ошибкой
+def fail_stale_jobs():
+    now = timezone.now()
+    return ExportJob.objects.filter(
+        status=ExportJob.STATUS_RUNNING,
+        started__lt=now - timedelta(seconds=settings.EXPORT_JOB_TIMEOUT),
+    ).update(status=ExportJob.STATUS_FAILED, error='Выгрузка прервана', finished=now)
+
+def run_export_job(job_id):
+    job = ExportJob.objects.get(id=job_id)
+    header, rows = EXPORTS[job.kind]
+    settings.EXPORT_ROOT.mkdir(parents=True, exist_ok=True)
+    path = settings.EXPORT_ROOT / f'{job.kind}-{job.id}.{job.format}'
+    try:
+        job.rows = WRITERS[job.format](path, header(), rows(job.params))
+        job.file = str(path)
+        job.status = ExportJob.STATUS_DONE
+    except Exception as error:
+        job.status = ExportJob.STATUS_FAILED
+        job.error = str(error)
+    job.finished = timezone.now()
+    job.save(update_fields=['status', 'rows', 'file', 'error', 'finished'])
+
+# Выполнение всех выгрузок из очереди. Возвращает их число
+def run_pending_exports():
+    fail_stale_jobs()
+    count = 0
+    while (job_id := claim_export_job()) is not None:
+        run_export_job(job_id)
+        count += 1
+    return count
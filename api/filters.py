@@ -0,0 +1,67 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
+DATE_FORMAT = '%Y-%m-%d'
+DATE_FORMAT_ERROR = 'Некорректный формат даты. Используйте YYYY-MM-DD'
+
+
+def parse_date(value):
+    if not value:
+        return None
+    return datetime.strptime(value, DATE_FORMAT).date()
+
+# Период из параметров dateFrom/dateTo (ValueError при неверном формате)
+def parse_date_range(params):
+    return parse_date(params.get('dateFrom')), parse_date(params.get('dateTo'))
+
+# Начало суток в текущем часовом поясе: границы периода для DateTimeField
+# (date__date__gte оборачивает столбец в функцию и не использует индекс)
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+# Отбор по DateTimeField за период dateFrom..dateTo включительно
+def filter_datetime_range(queryset, field, params):
+    date_from, date_to = parse_date_range(params)
+    if date_from:
+        queryset = queryset.filter(**{f'{field}__gte': day_start(date_from)})
+    if date_to:
+        queryset = queryset.filter(**{f'{field}__lt': day_start(date_to + timedelta(days=1))})
+    return queryset
+
+# Общие фильтры учёта времени: сотрудник, объект, период
+def filter_work_time(queryset, params):
+    date_from, date_to = parse_date_range(params)
+
+    personnel_number = params.get('personnelNumber')
+    if personnel_number:
+        queryset = queryset.filter(employee__personnelNumber=personnel_number)
+
+    object_name = params.get('object')
+    if object_name:
+        queryset = queryset.filter(employee__object__name=object_name)
+
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset
+
+# Фильтры списка учёта времени (listWTT): табельный номер, часть ФИО, период
+def filter_work_time_list(queryset, params):
+    date_from, date_to = parse_date_range(params)
+
+    personnel_number = params.get('personnelNumber')
+    if personnel_number:
+        queryset = queryset.filter(employee__personnelNumber=personnel_number)
+
+    full_name = params.get('fullName')
+    if full_name:
+        queryset = queryset.filter(employee__fullName__icontains=full_name)
+
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset
@@ -0,0 +1,139 @@
+import csv
+
+from django.core.exceptions import ValidationError
+from django.core.validators import EmailValidator
+from django.db import transaction
+
+from . import lookups
+from .models import CustomUser, Employee
+
+EMPLOYEE_COLUMNS = [
+    'fullName', 'personnelNumber', 'phoneNumber', 'email',
+    'bankDetails', 'passport', 'jobTitle', 'object', 'user',
+]
+EMPLOYEE_REQUIRED = [
+    'fullName', 'personnelNumber', 'phoneNumber', 'email',
+    'bankDetails', 'passport', 'jobTitle', 'object',
+]
+MAX_LENGTHS = {
+    'fullName': Employee._meta.get_field('fullName').max_length,
+    'personnelNumber': Employee._meta.get_field('personnelNumber').max_length,
+    'phoneNumber': Employee._meta.get_field('phoneNumber').max_length,
+}
+# Размер порции для IN (...) и bulk_create
+CHUNK_SIZE = 500
+# Кодировка файла (BOM, который добавляет Excel, пропускается)
+CSV_ENCODING = 'utf-8-sig'
+
+
+class ImportFileError(Exception):
+    pass
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _existing(queryset, field, values, *fields):
+    result = []
+    for chunk in _chunks(values):
+        result += queryset.filter(**{f'{field}__in': chunk}).values_list(*fields)
+    return result
+
+def _read_rows(file):
+    sample = file.read(4096)
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(file, dialect=dialect)
+    return [(reader.line_num, row) for row in reader]
+
+# Файл не в UTF-8 (например, cp1251 из Excel) — ошибка файла, а не строк
+def read_rows(file):
+    try:
+        return _read_rows(file)
+    except UnicodeDecodeError:
+        raise ImportFileError('Файл должен быть в кодировке UTF-8 (в Excel: «CSV UTF-8 (разделитель — запятая)»)')
+
+# Импорт сотрудников из CSV: все строки проверяются по заранее загруженным
+# множествам ключей, ошибки возвращаются разом; при ошибках ничего не создаётся.
+# ImportFileError — если файл не удалось прочитать
+def import_employees(file):
+    rows = read_rows(file)
+    values = [
+        {column: (row.get(column) or '').strip() for column in EMPLOYEE_COLUMNS}
+        for _, row in rows
+    ]
+
+    numbers = {value['personnelNumber'] for value in values if value['personnelNumber']}
+    logins = {value['user'] for value in values if value['user']}
+    taken_numbers = {number for (number,) in _existing(Employee.objects, 'personnelNumber', numbers, 'personnelNumber')}
+    users = dict(_existing(CustomUser.objects, 'login', logins, 'login', 'id'))
+    bound_users = {user_id for (user_id,) in _existing(Employee.objects, 'user__login', logins, 'user_id')}
+
+    validate_email = EmailValidator()
+    seen_numbers = set()
+    seen_users = set()
+    errors = []
+    employees = []
+    for (line, _), value in zip(rows, values):
+        row_errors = {}
+        for column in EMPLOYEE_REQUIRED:
+            if not value[column]:
+                row_errors[column] = 'Обязательное поле.'
+        for column, max_length in MAX_LENGTHS.items():
+            if len(value[column]) > max_length:
+                row_errors[column] = f'Не более {max_length} символов.'
+
+        number = value['personnelNumber']
+        if number in taken_numbers:
+            row_errors['personnelNumber'] = 'Сотрудник с таким табельным номером уже существует.'
+        elif number in seen_numbers:
+            row_errors['personnelNumber'] = 'Табельный номер повторяется в файле.'
+        seen_numbers.add(number)
+
+        if value['email']:
+            try:
+                validate_email(value['email'])
+            except ValidationError:
+                row_errors['email'] = 'Некорректный email.'
+        if value['jobTitle'] and not lookups.job_titles.exists(value['jobTitle']):
+            row_errors['jobTitle'] = 'Должность с таким названием не найдена.'
+        if value['object'] and not lookups.objects.exists(value['object']):
+            row_errors['object'] = 'Объект с таким названием не найден.'
+
+        user_id = None
+        if value['user']:
+            user_id = users.get(value['user'])
+            if user_id is None:
+                row_errors['user'] = 'Пользователь с таким логином не найден.'
+            elif user_id in bound_users or user_id in seen_users:
+                row_errors['user'] = 'Пользователь уже привязан к другому сотруднику.'
+            seen_users.add(user_id)
+
+        if row_errors:
+            errors.append({'row': line, 'errors': row_errors})
+            continue
+
+        employees.append(Employee(
+            fullName=value['fullName'],
+            personnelNumber=number,
+            phoneNumber=value['phoneNumber'],
+            email=value['email'],
+            bankDetails=value['bankDetails'],
+            passport=value['passport'],
+            jobTitle=lookups.job_titles.get(value['jobTitle']),
+            object=lookups.objects.get(value['object']),
+            user_id=user_id,
+        ))
+
+    if errors:
+        return 0, errors
+
+    with transaction.atomic():
+        for chunk in _chunks(employees):
+            Employee.objects.bulk_create(chunk)
+    return len(employees), []
@@ -0,0 +1,147 @@
+import json
+import uuid
+
+from django.db import transaction
+from django.db.models import Max, Min, OuterRef, Exists, Subquery
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .models import ClockEvent, Employee, WorkTimeTracking
+from .reports import invalidate_work_time
+
+
+# Пакет событий в формате JSON Lines: одно событие на строку
+class JSONLinesParser(BaseParser):
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return [
+                json.loads(line)
+                for line in stream.read().decode('utf-8').splitlines() if line.strip()
+            ]
+        except ValueError as error:
+            raise ParseError(f'JSON Lines parse error - {error}')
+
+
+class ClockEventSerializer(serializers.Serializer):
+    clientEventId = serializers.CharField(max_length=100)
+    personnelNumber = serializers.CharField()
+    kind = serializers.ChoiceField(choices=ClockEvent.KIND_CHOICES)
+    timestamp = serializers.DateTimeField()
+
+
+def _local(timestamp):
+    if timezone.is_aware(timestamp):
+        timestamp = timezone.localtime(timestamp).replace(tzinfo=None)
+    return timestamp.date(), timestamp.time()
+
+# Время из сохранённых событий дня для строки учёта (коррелированный подзапрос)
+def _event_time(kind, aggregate):
+    return Subquery(
+        ClockEvent.objects
+        .filter(kind=kind, employee_id=OuterRef('employee_id'), workDate=OuterRef('date'))
+        .values('employee_id', 'workDate')
+        .annotate(value=aggregate('workTime'))
+        .values('value')
+    )
+
+# Применение пакета к учёту двумя UPDATE: ранний старт и поздний конец дня имеют приоритет.
+# Обновляются дни, которых касается пакет, по всем сохранённым событиям этих дней —
+# конец дня, пришедший раньше начала, применяется, когда придёт начало
+def _apply_batch(batch, date_from, date_to):
+    in_batch = ClockEvent.objects.filter(batch=batch, employee_id=OuterRef('employee_id'), workDate=OuterRef('date'))
+    rows = WorkTimeTracking.objects.filter(Exists(in_batch), date__gte=date_from, date__lte=date_to)
+
+    first_start = _event_time(ClockEvent.KIND_START, Min)
+    rows.filter(Exists(first_start)).update(startTime=Least('startTime', first_start))
+
+    last_stop = _event_time(ClockEvent.KIND_STOP, Max)
+    rows.filter(Exists(last_stop)).update(endTime=Greatest(Coalesce('endTime', last_stop), last_stop))
+
+# Концы дня без строки учёта (начало ещё не пришло): сохранены, но не применены
+def _pending_stops(events):
+    stops = [event for event in events if event.kind == ClockEvent.KIND_STOP]
+    if not stops:
+        return []
+    started = set(
+        WorkTimeTracking.objects
+        .filter(employee_id__in={event.employee_id for event in stops}, date__in={event.workDate for event in stops})
+        .values_list('employee_id', 'date')
+    )
+    return [event for event in stops if (event.employee_id, event.workDate) not in started]
+
+# Приём пакета событий: проверка, отсев повторов по clientEventId
+# и применение к учёту времени множественными запросами
+def ingest_clock_events(items):
+    errors = []
+    events = {}
+    # Один экземпляр сериализатора на весь пакет (как в ListSerializer)
+    validator = ClockEventSerializer()
+    for index, item in enumerate(items):
+        try:
+            data = validator.run_validation(item)
+        except serializers.ValidationError as error:
+            errors.append({'index': index, 'errors': error.detail})
+            continue
+        events.setdefault(data['clientEventId'], (index, data))
+
+    known = set(
+        ClockEvent.objects.filter(clientEventId__in=events).values_list('clientEventId', flat=True)
+    )
+    numbers = {data['personnelNumber'] for _, data in events.values()}
+    employees = dict(
+        Employee.objects.filter(personnelNumber__in=numbers).values_list('personnelNumber', 'id')
+    )
+
+    batch = uuid.uuid4().hex
+    new_events = []
+    indexes = {}
+    starts = {}
+    for event_id, (index, data) in events.items():
+        if event_id in known:
+            continue
+        employee_id = employees.get(data['personnelNumber'])
+        if employee_id is None:
+            errors.append({'index': index, 'errors': {'personnelNumber': ['Сотрудник с таким табельным номером не найден']}})
+            continue
+
+        indexes[event_id] = index
+        day, moment = _local(data['timestamp'])
+        new_events.append(ClockEvent(
+            clientEventId=event_id, employee_id=employee_id, kind=data['kind'],
+            timestamp=data['timestamp'], workDate=day, workTime=moment, batch=batch,
+        ))
+        if data['kind'] == ClockEvent.KIND_START:
+            starts[(employee_id, day)] = min(moment, starts.get((employee_id, day), moment))
+
+    pending = []
+    if new_events:
+        days = [event.workDate for event in new_events]
+        with transaction.atomic():
+            ClockEvent.objects.bulk_create(new_events, ignore_conflicts=True)
+            WorkTimeTracking.objects.bulk_create(
+                [
+                    WorkTimeTracking(employee_id=employee_id, date=day, startTime=moment)
+                    for (employee_id, day), moment in starts.items()
+                ],
+                ignore_conflicts=True,
+            )
+            _apply_batch(batch, min(days), max(days))
+            pending = _pending_stops(new_events)
+        invalidate_work_time(days)
+
+    # pending — концы дня, сохранённые до прихода начала; повторно их отправлять не нужно
+    return {
+        'received': len(items),
+        'accepted': len(new_events) - len(pending),
+        'pending': sorted(
+            ({'index': indexes[event.clientEventId], 'clientEventId': event.clientEventId} for event in pending),
+            key=lambda event: event['index'],
+        ),
+        'duplicates': len(items) - len(errors) - len(new_events),
+        'errors': sorted(errors, key=lambda error: error['index']),
+    }
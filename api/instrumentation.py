@@ -0,0 +1,195 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import renderers
+
+logger = logging.getLogger('api.instrumentation')
+
+# Замеры запроса: число SQL-запросов и время в БД, сериализаторах
+# и отрисовке ответа. Итог — в заголовке Server-Timing и строке лога.
+# Запросы считаются обёрткой execute_wrapper на каждом соединении, поэтому
+# учитываются и запросы async-представлений (контекст переходит в потоки).
+# Сериализация замеряется в ViewSet (InstrumentedViewSetMixin), отрисовка —
+# в рендерерах DRF (REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES']).
+# Потоковые ответы дочитываются после middleware и в замеры не входят
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.render_time = 0.0
+        self._active = set()
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'serializer;dur={self.serializer_time * 1000:.1f}',
+            f'render;dur={self.render_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ])
+
+
+### ЗАМЕРЫ ###
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+def _add_query_wrapper(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+def _on_connection_created(sender, connection, **kwargs):
+    _add_query_wrapper(connection)
+
+# Подключение счётчика запросов: вызывается один раз из ApiConfig.ready()
+def install():
+    if not settings.INSTRUMENTATION_ENABLED:
+        return
+    connection_created.connect(_on_connection_created, dispatch_uid='api.instrumentation')
+    for connection in connections.all(initialized_only=True):
+        _add_query_wrapper(connection)
+
+# Время блока без SQL-запросов внутри него (field — serializer_time или render_time).
+# Вложенные замеры того же вида не суммируются повторно
+@contextmanager
+def timed(field):
+    metrics = _current.get()
+    if metrics is None or field in metrics._active:
+        yield
+        return
+    metrics._active.add(field)
+    started, db_time = time.perf_counter(), metrics.db_time
+    try:
+        yield
+    finally:
+        metrics._active.discard(field)
+        elapsed = time.perf_counter() - started - (metrics.db_time - db_time)
+        setattr(metrics, field, getattr(metrics, field) + elapsed)
+
+
+### DRF ###
+
+# Сериализация в list/retrieve (выборка из БД вычитается)
+class InstrumentedViewSetMixin:
+    def list(self, request, *args, **kwargs):
+        with timed('serializer_time'):
+            return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        with timed('serializer_time'):
+            return super().retrieve(request, *args, **kwargs)
+
+class TimedRendererMixin:
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render_time'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+class JSONRenderer(TimedRendererMixin, renderers.JSONRenderer):
+    pass
+
+class BrowsableAPIRenderer(TimedRendererMixin, renderers.BrowsableAPIRenderer):
+    pass
+
+
+### БЮДЖЕТ ЗАПРОСОВ ###
+
+# query_budget представления: число или словарь {действие/метод: число}.
+# Превышение в работе только пишется в лог, проверка — в тестах (api/tests.py)
+def query_budget(view_class, action):
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        return budget.get(action)
+    return budget
+
+def _request_budget(request):
+    view_func = getattr(request, '_instrumented_view', None)
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+    if view_class is None:
+        return None, None
+    method = request.method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+    return view_class.__name__, query_budget(view_class, actions.get(method, method))
+
+
+### MIDDLEWARE ###
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._instrumented_view = view_func
+        return None
+
+    def finish(self, request, response, metrics):
+        view_name, budget = _request_budget(request)
+        response['Server-Timing'] = metrics.server_timing()
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'dbMs': round(metrics.db_time * 1000, 1),
+            'serializerMs': round(metrics.serializer_time * 1000, 1),
+            'renderMs': round(metrics.render_time * 1000, 1),
+            'totalMs': round(metrics.total_time * 1000, 1),
+        }))
+
+        if budget is not None and metrics.queries > budget:
+            logger.warning(
+                '%s %s %s: %s SQL-запросов при бюджете %s',
+                view_name, request.method, request.path, metrics.queries, budget,
+            )
+        return response
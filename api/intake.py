@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.utils import timezone
+
+from . import lookups
+from .db import retry_on_locked
+from .models import ClientsApplication, ClientsApplicationStatus, ClientsApplicationType
+from .rollups import application_key, apply_applications
+
+# Приём заявок с сайта: direct — сразу в БД, buffered — в очередь на диске,
+# откуда их пачками переносит flush_intake
+INTAKE_DIRECT = 'direct'
+INTAKE_BUFFERED = 'buffered'
+
+DEFAULT_TYPE = 'Обратный звонок'
+DEFAULT_STATUS = 'Новая'
+
+MAX_LENGTHS = {
+    'fullName': ClientsApplication._meta.get_field('fullName').max_length,
+    'phoneNumber': ClientsApplication._meta.get_field('phoneNumber').max_length,
+}
+
+
+def buffered_intake():
+    return settings.APPLICATION_INTAKE_MODE == INTAKE_BUFFERED
+
+def _spool_dir(name):
+    path = os.path.join(settings.INTAKE_SPOOL_DIR, name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+### ПРИЁМ ###
+
+# Лёгкая проверка заявки без сериализатора и запросов к БД
+# (тип и статус проверяются по кешу справочников). Возвращает (данные, ошибки)
+def validate_submission(data):
+    errors = {}
+    submission = {}
+
+    for field in ('fullName', 'phoneNumber', 'description'):
+        value = data.get(field)
+        if not isinstance(value, str) or not value.strip():
+            errors[field] = ['Обязательное поле.']
+            continue
+        value = value.strip()
+        max_length = MAX_LENGTHS.get(field)
+        if max_length and len(value) > max_length:
+            errors[field] = [f'Не более {max_length} символов.']
+            continue
+        submission[field] = value
+
+    for field, lookup in (('type_name', lookups.application_types), ('status_name', lookups.application_statuses)):
+        value = data.get(field)
+        if not value:
+            continue
+        if not isinstance(value, str) or not lookup.exists(value):
+            errors[field] = [f'Значение "{value}" не найдено.']
+            continue
+        submission[field] = value
+
+    return submission, errors
+
+# Повтор той же заявки (телефон + текст) за INTAKE_DEDUPE_WINDOW секунд не принимается
+def is_duplicate(submission):
+    phone = re.sub(r'\D', '', submission['phoneNumber'])
+    text = ' '.join(submission['description'].lower().split())
+    digest = hashlib.sha1(f'{phone}\0{text}'.encode()).hexdigest()
+    return not cache.add(f'intake:seen:{digest}', 1, settings.INTAKE_DEDUPE_WINDOW)
+
+# Запись заявки в очередь: файл пишется во временный и переименовывается,
+# поэтому flush_intake никогда не видит его недописанным
+def enqueue_submission(submission):
+    received = timezone.now()
+    submission = dict(submission, date=received.isoformat())
+    # Имя начинается со времени приёма — очередь разбирается по порядку
+    name = f'{received:%Y%m%d%H%M%S%f}-{uuid.uuid4().hex}.json'
+    tmp_path = os.path.join(_spool_dir('tmp'), name)
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(submission, file, ensure_ascii=False)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, os.path.join(_spool_dir('incoming'), name))
+
+
+### ПЕРЕНОС В БД ###
+
+def _existing_ids(model, ids):
+    return set(model.objects.filter(id__in=ids).values_list('id', flat=True))
+
+def _build_application(submission):
+    return ClientsApplication(
+        fullName=submission['fullName'],
+        phoneNumber=submission['phoneNumber'],
+        description=submission['description'],
+        type=lookups.application_types.get(submission.get('type_name') or DEFAULT_TYPE),
+        status=lookups.application_statuses.get(submission.get('status_name') or DEFAULT_STATUS),
+        date=datetime.fromisoformat(submission['date']),
+    )
+
+# Перенос одной пачки из очереди в ClientsApplication (bulk_create)
+# и обновление сводки панели. Возвращает (перенесено, отложено с ошибкой).
+# Рассчитан на один обработчик: при сбое после COMMIT пачка из processing
+# будет перенесена повторно (доставка «хотя бы один раз»)
+@retry_on_locked
+def flush_batch(batch_size=None):
+    batch_size = batch_size or settings.INTAKE_BATCH_SIZE
+    incoming = _spool_dir('incoming')
+    processing = _spool_dir('processing')
+    failed = _spool_dir('failed')
+
+    # Файлы, оставшиеся в processing после сбоя, обрабатываются первыми
+    names = sorted(os.listdir(processing))
+    for name in sorted(os.listdir(incoming))[:max(batch_size - len(names), 0)]:
+        try:
+            os.replace(os.path.join(incoming, name), os.path.join(processing, name))
+        except FileNotFoundError:
+            continue
+        names.append(name)
+    names = names[:batch_size]
+
+    built, broken = {}, []
+    for name in names:
+        try:
+            with open(os.path.join(processing, name), encoding='utf-8') as file:
+                built[name] = _build_application(json.load(file))
+        except (ValueError, KeyError, ObjectDoesNotExist):
+            # Битый файл или удалённый тип/статус — откладываем для разбора
+            broken.append(name)
+
+    with transaction.atomic():
+        # Справочник процесса может ещё не знать об удалении типа или статуса
+        # (см. lookups.py) — иначе вся пачка упадёт на внешнем ключе
+        type_ids = _existing_ids(ClientsApplicationType, {app.type_id for app in built.values()})
+        status_ids = _existing_ids(ClientsApplicationStatus, {app.status_id for app in built.values()})
+        for name, application in list(built.items()):
+            if application.type_id not in type_ids or application.status_id not in status_ids:
+                del built[name]
+                broken.append(name)
+        applications = list(built.values())
+        ClientsApplication.objects.bulk_create(applications, batch_size=500)
+        apply_applications(application_key(application) for application in applications)
+
+    for name in built:
+        os.remove(os.path.join(processing, name))
+    for name in broken:
+        os.replace(os.path.join(processing, name), os.path.join(failed, name))
+    return len(applications), len(broken)
+
+def flush_intake(batch_size=None):
+    total = rejected = 0
+    while True:
+        flushed, failed = flush_batch(batch_size)
+        total += flushed
+        rejected += failed
+        if not flushed and not failed:
+            return total, rejected
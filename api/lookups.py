@@ -0,0 +1,46 @@
+import copy
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import get_version
+from .conditional import table_version_name
+from .models import Role, JobTitle, Object, ClientsApplicationType, ClientsApplicationStatus
+
+
+# Справочник name -> строка в памяти процесса.
+# Перечитывается целиком, когда меняется версия таблицы в общем кеше
+# (версию сбрасывают сигналы, см. signals.py), так что изменения
+# видны всем процессам. Не реже раза в LOOKUP_MAX_AGE секунд справочник
+# перечитывается и без смены версии — на случай потерянного сброса
+class NameLookup:
+    def __init__(self, model):
+        self.model = model
+        self._state = (None, 0, {})
+
+    def _rows(self):
+        version = get_version(table_version_name(self.model))
+        cached_version, loaded, rows = self._state
+        if version != cached_version or time.monotonic() - loaded >= settings.LOOKUP_MAX_AGE:
+            # При одинаковых названиях остаётся строка с меньшим id, как у .first().
+            # С основной БД: реплика может ещё не знать об изменении из новой версии
+            rows = {obj.name: obj for obj in self.model.objects.using(DEFAULT_DB_ALIAS).order_by('-id')}
+            self._state = (version, time.monotonic(), rows)
+        return rows
+
+    def get(self, name):
+        try:
+            return copy.copy(self._rows()[name])
+        except KeyError:
+            raise self.model.DoesNotExist(f'{self.model.__name__} "{name}" не найден')
+
+    def exists(self, name):
+        return name in self._rows()
+
+
+roles = NameLookup(Role)
+job_titles = NameLookup(JobTitle)
+objects = NameLookup(Object)
+application_types = NameLookup(ClientsApplicationType)
+application_statuses = NameLookup(ClientsApplicationStatus)
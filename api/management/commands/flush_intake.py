@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.intake import flush_intake
+
+
+class Command(BaseCommand):
+    help = 'Перенос заявок из очереди приёма (APPLICATION_INTAKE_MODE=buffered) в БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно, проверяя очередь каждые --interval секунд')
+        parser.add_argument('--interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        while True:
+            flushed, rejected = flush_intake(options['batch_size'])
+            if flushed or rejected or not options['loop']:
+                self.stdout.write(f'Перенесено заявок: {flushed}, отложено с ошибкой: {rejected}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
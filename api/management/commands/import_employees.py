@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.imports import CSV_ENCODING, ImportFileError, import_employees
+
+
+class Command(BaseCommand):
+    help = 'Импорт сотрудников из CSV (колонки как в API сотрудников)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+
+    def handle(self, *args, **options):
+        with open(options['path'], encoding=CSV_ENCODING, newline='') as file:
+            try:
+                created, errors = import_employees(file)
+            except ImportFileError as e:
+                raise CommandError(str(e))
+
+        if errors:
+            for error in errors:
+                details = '; '.join(f'{field}: {message}' for field, message in error['errors'].items())
+                self.stderr.write(f'Строка {error["row"]}: {details}')
+            raise CommandError(f'Импорт отменён: ошибок в строках — {len(errors)}')
+
+        self.stdout.write(self.style.SUCCESS(f'Создано сотрудников: {created}'))
@@ -3,20 +3,21 @@ from django.contrib.auth.hashers import make_password
 
 from api.models import Role, CustomUser, ClientsApplicationStatus, ClientsApplicationType
 
+# Предустановленные роли (используются и при построении матрицы доступа)
+DEFAULT_ROLES = [
+    {'name': 'admin', 'description': 'Администратор'},
+    {'name': 'hr', 'description': 'Отдел кадров'},
+    {'name': 'marketer', 'description': 'Маркетолог'},
+    {'name': 'foreman', 'description': 'Прораб'},
+    {'name': 'storekeeper', 'description': 'Кладовщик'},
+    {'name': 'basic', 'description': 'Базовый пользователь'},
+]
+
 class Command(BaseCommand):
     help = 'Создание предустановленных ролей и администратора'
 
     def handle(self, *args, **kwargs):
-        roles = [
-            {'name': 'admin', 'description': 'Администратор'},
-            {'name': 'hr', 'description': 'Отдел кадров'},
-            {'name': 'marketer', 'description': 'Маркетолог'},
-            {'name': 'foreman', 'description': 'Прораб'},
-            {'name': 'storekeeper', 'description': 'Кладовщик'},
-            {'name': 'basic', 'description': 'Базовый пользователь'},
-        ]
-
-        for role in roles:
+        for role in DEFAULT_ROLES:
             obj, created = Role.objects.get_or_create(
                 name=role['name'],
                 defaults={'description': role['description']}
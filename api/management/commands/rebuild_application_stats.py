@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.rollups import rebuild_application_stats
+
+
+class Command(BaseCommand):
+    help = 'Полный пересчёт сводки заявок для панели (ApplicationDailyStat)'
+
+    def handle(self, *args, **options):
+        rows = rebuild_application_stats()
+        self.stdout.write(self.style.SUCCESS(f'Сводка заявок пересчитана, строк: {rows}'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.exports import run_pending_exports
+
+
+class Command(BaseCommand):
+    help = 'Выполнение фоновых выгрузок (табель XLSX и большие CSV)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Работать постоянно, проверяя очередь каждые --interval секунд')
+        parser.add_argument('--interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        while True:
+            count = run_pending_exports()
+            if count or not options['loop']:
+                self.stdout.write(f'Выполнено выгрузок: {count}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,44 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.routing import record_replica_sync
+
+
+class Command(BaseCommand):
+    help = 'Копирование основной БД SQLite в реплику для чтения (SQLITE_REPLICA_PATH)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Копировать постоянно, каждые --interval секунд')
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        alias = settings.REPLICA_DB_ALIAS
+        if alias not in settings.DATABASES:
+            raise CommandError('Реплика не настроена (SQLITE_REPLICA_PATH)')
+        if connections['default'].vendor != 'sqlite' or connections[alias].vendor != 'sqlite':
+            raise CommandError('Копирование файла возможно только для SQLite; реплика Postgres обновляется репликацией')
+
+        while True:
+            started = self.sync(settings.DATABASES['default']['NAME'], settings.DATABASES[alias]['NAME'])
+            self.stdout.write(f'Реплика обновлена за {time.time() - started:.2f} с')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    # Backup API SQLite: согласованный снимок без остановки записи,
+    # копия пишется поверх файла реплики, читатели видят старую или новую версию
+    def sync(self, source_path, replica_path):
+        started = time.time()
+        source = sqlite3.connect(source_path, timeout=settings.SQLITE_TIMEOUT)
+        replica = sqlite3.connect(replica_path, timeout=settings.SQLITE_TIMEOUT)
+        try:
+            source.backup(replica)
+        finally:
+            replica.close()
+            source.close()
+        record_replica_sync(started)
+        return started
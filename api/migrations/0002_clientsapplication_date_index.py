@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clientsapplication',
+            index=models.Index(fields=['date', 'id'], name='api_clients_date_0a83c6_idx'),
+        ),
+    ]
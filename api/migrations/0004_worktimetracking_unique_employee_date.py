@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:45
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+# Перед добавлением ограничения оставляем одну запись на (сотрудник, дата):
+# самую раннюю, с самым поздним временем окончания из дубликатов
+def merge_duplicate_work_days(apps, schema_editor):
+    WorkTimeTracking = apps.get_model('api', 'WorkTimeTracking')
+    duplicates = (
+        WorkTimeTracking.objects
+        .values('employee_id', 'date')
+        .annotate(count=Count('id'), keep_id=Min('id'), end=Max('endTime'))
+        .filter(count__gt=1)
+    )
+    for row in duplicates:
+        WorkTimeTracking.objects.filter(id=row['keep_id'], endTime__isnull=True).update(endTime=row['end'])
+        WorkTimeTracking.objects.filter(
+            employee_id=row['employee_id'], date=row['date']
+        ).exclude(id=row['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_exportjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_work_days, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='worktimetracking',
+            index=models.Index(fields=['date'], name='api_worktim_date_42623a_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='worktimetracking',
+            constraint=models.UniqueConstraint(fields=('employee', 'date'), name='unique_employee_work_date'),
+        ),
+    ]
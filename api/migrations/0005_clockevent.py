@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_worktimetracking_unique_employee_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClockEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clientEventId', models.CharField(max_length=100, unique=True)),
+                ('kind', models.CharField(choices=[('start', 'Начало рабочего дня'), ('stop', 'Конец рабочего дня')], max_length=10)),
+                ('timestamp', models.DateTimeField()),
+                ('workDate', models.DateField()),
+                ('workTime', models.TimeField()),
+                ('batch', models.CharField(max_length=32)),
+                ('received', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['batch', 'employee', 'workDate'], name='api_clockev_batch_65afa0_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:50
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+FTS_TABLE = 'api_clientsapplication_fts'
+
+
+def _digits(column):
+    sql = column
+    for char in (' ', '-', '(', ')', '+'):
+        sql = f"replace({sql}, '{char}', '')"
+    return sql
+
+
+def _insert(prefix):
+    return (
+        f'INSERT INTO {FTS_TABLE} (rowid, fullName, phoneNumber, phoneDigits, description) '
+        f'VALUES ({prefix}.id, {prefix}.fullName, {prefix}.phoneNumber, '
+        f'{_digits(prefix + ".phoneNumber")}, {prefix}.description);'
+    )
+
+
+SQLITE_FORWARD = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"fullName, phoneNumber, phoneDigits, description, tokenize='trigram')",
+    f'INSERT INTO {FTS_TABLE} (rowid, fullName, phoneNumber, phoneDigits, description) '
+    f'SELECT id, fullName, phoneNumber, {_digits("phoneNumber")}, description FROM api_clientsapplication',
+    f'CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON api_clientsapplication BEGIN '
+    f'{_insert("new")} END',
+    f'CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON api_clientsapplication BEGIN '
+    f'DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END',
+    f'CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON api_clientsapplication BEGIN '
+    f'DELETE FROM {FTS_TABLE} WHERE rowid = old.id; {_insert("new")} END',
+]
+
+SQLITE_BACKWARD = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS api_clientsapplication_fullname_trgm '
+    'ON api_clientsapplication USING gin ("fullName" gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS api_clientsapplication_phone_trgm '
+    'ON api_clientsapplication USING gin ("phoneNumber" gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS api_clientsapplication_description_trgm '
+    'ON api_clientsapplication USING gin ("description" gin_trgm_ops)',
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS api_clientsapplication_fullname_trgm',
+    'DROP INDEX IF EXISTS api_clientsapplication_phone_trgm',
+    'DROP INDEX IF EXISTS api_clientsapplication_description_trgm',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+# Индекс для поиска заявок: FTS5 (trigram) с триггерами в SQLite,
+# pg_trgm GIN-индексы в Postgres. Без поддержки FTS5 поиск работает через LIKE
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            _run(schema_editor, SQLITE_FORWARD[:1])
+        except OperationalError:
+            return
+        _run(schema_editor, SQLITE_FORWARD[1:])
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_BACKWARD)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_clockevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+# Одинаковые материалы на одном объекте сливаются в одну строку с суммой остатков,
+# а каждый остаток получает начальную запись в журнале движений
+def merge_materials_and_open_ledger(apps, schema_editor):
+    Material = apps.get_model('api', 'Material')
+    MaterialMovement = apps.get_model('api', 'MaterialMovement')
+
+    duplicates = (
+        Material.objects
+        .values('object_id', 'name')
+        .annotate(count=Count('id'), keep_id=Min('id'), total=Sum('amount'))
+        .filter(count__gt=1)
+    )
+    for row in duplicates:
+        Material.objects.filter(id=row['keep_id']).update(amount=row['total'])
+        Material.objects.filter(
+            object_id=row['object_id'], name=row['name']
+        ).exclude(id=row['keep_id']).delete()
+
+    MaterialMovement.objects.bulk_create([
+        MaterialMovement(
+            kind='adjustment', name=material.name, amount=material.amount,
+            target_id=material.object_id, comment='Начальный остаток',
+        )
+        for material in Material.objects.all()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_clientsapplication_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterialMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('receipt', 'Приход'), ('issue', 'Расход'), ('transfer', 'Перемещение'), ('adjustment', 'Корректировка')], max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('comment', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='materialmovement',
+            name='source',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outgoing_movements', to='api.object'),
+        ),
+        migrations.AddField(
+            model_name='materialmovement',
+            name='target',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='incoming_movements', to='api.object'),
+        ),
+        migrations.AddField(
+            model_name='materialmovement',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.customuser'),
+        ),
+        migrations.AddIndex(
+            model_name='materialmovement',
+            index=models.Index(fields=['date', 'id'], name='api_materia_date_399eb8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='materialmovement',
+            index=models.Index(fields=['name', 'date'], name='api_materia_name_579647_idx'),
+        ),
+        migrations.RunPython(merge_materials_and_open_ledger, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='material',
+            constraint=models.UniqueConstraint(fields=('object', 'name'), name='unique_object_material'),
+        ),
+    ]
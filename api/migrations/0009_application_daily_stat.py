@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+# Начальное заполнение сводки по существующим заявкам
+def fill_application_stats(apps, schema_editor):
+    ClientsApplication = apps.get_model('api', 'ClientsApplication')
+    ApplicationDailyStat = apps.get_model('api', 'ApplicationDailyStat')
+
+    rows = (
+        ClientsApplication.objects
+        .annotate(day=TruncDate('date'))
+        .values('day', 'type_id', 'status_id')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    ApplicationDailyStat.objects.bulk_create([
+        ApplicationDailyStat(date=row['day'], type_id=row['type_id'], status_id=row['status_id'], count=row['count'])
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_material_amount_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('status', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='api.clientsapplicationstatus')),
+                ('type', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='api.clientsapplicationtype')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='api_applica_date_eee400_idx'), models.Index(fields=['status', 'date'], name='api_applica_status__7c67e4_idx'), models.Index(fields=['type', 'date'], name='api_applica_type_id_0c8a66_idx')],
+            },
+        ),
+        migrations.RunPython(fill_application_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:56
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_application_daily_stat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='clientsapplication',
+            name='date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,26 @@
+import importlib
+
+from django.db import migrations
+
+search_index = importlib.import_module('api.migrations.0006_clientsapplication_search')
+
+
+# SQLite пересоздаёт таблицу при AlterField (0010), и триггеры индекса
+# поиска пропадают. Индекс строится заново вместе с триггерами.
+# То же нужно после любого будущего AlterField для ClientsApplication
+def rebuild_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    search_index.drop_search_index(apps, schema_editor)
+    search_index.create_search_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_clientsapplication_date_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop),
+    ]
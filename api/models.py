@@ -1,5 +1,6 @@
 from django.db import models
-from django.contrib.auth.hashers import make_password, check_password
+from django.utils import timezone
+from django.contrib.auth.hashers import make_password, check_password, identify_hasher
 
 class Role(models.Model):
     name = models.CharField(max_length=100)
@@ -22,14 +23,34 @@ class CustomUser(models.Model):
         self._password = make_password(raw_password)
 
     def check_password(self, raw_password):
-        return check_password(raw_password, self._password)
+        # При устаревших параметрах хешера пароль перехешируется при входе
+        is_valid, rehashed = self.verify_password(raw_password)
+        if rehashed:
+            self.save(update_fields=['_password'])
+        return is_valid
+
+    # Проверка без записи в БД: (пароль верен, хеш обновлён и его нужно сохранить)
+    def verify_password(self, raw_password):
+        rehashed = []
+        def setter(raw_password):
+            self.password = raw_password
+            rehashed.append(True)
+        return check_password(raw_password, self._password, setter), bool(rehashed)
 
     def save(self, *args, **kwargs):
     # Если пароль был изменён и не хеширован
-        if self._password and not self._password.startswith('pbkdf2_'):
+        if self._password and not self._is_hashed(self._password):
             self.password = self._password  # Вызовет @password.setter
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def _is_hashed(value):
+        try:
+            identify_hasher(value)
+        except ValueError:
+            return False
+        return True
+
     def __str__(self):
         return self.login
 
@@ -81,24 +102,157 @@ class ClientsApplication(models.Model):
     description = models.TextField()
     type = models.ForeignKey(ClientsApplicationType, on_delete=models.SET_NULL, null=True)
     status = models.ForeignKey(ClientsApplicationStatus, on_delete=models.SET_NULL, null=True)
-    date = models.DateTimeField(auto_now_add=True)
+    # Не auto_now_add: заявки из очереди (intake.py) сохраняют время приёма
+    date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.fullName} - {self.type.name}"
 
+# Число заявок за день по типу и статусу (сводка для панели, см. rollups.py).
+# Строки за один ключ могут повторяться — при чтении значения суммируются
+class ApplicationDailyStat(models.Model):
+    date = models.DateField()
+    # Отдельные индексы не нужны — поля ведут составные индексы ниже
+    type = models.ForeignKey(ClientsApplicationType, on_delete=models.CASCADE, null=True, db_index=False)
+    status = models.ForeignKey(ClientsApplicationStatus, on_delete=models.CASCADE, null=True, db_index=False)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['status', 'date']),
+            models.Index(fields=['type', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.count}"
+
 class WorkTimeTracking(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
     date = models.DateField()
     startTime = models.TimeField()
     endTime = models.TimeField(null=True)
 
+    class Meta:
+        constraints = [
+            # Одна запись о рабочем дне на сотрудника; индекс (employee, date)
+            models.UniqueConstraint(fields=['employee', 'date'], name='unique_employee_work_date'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
     def __str__(self):
         return f"{self.employee.fullName} - {self.date}"
 
+class ClockEvent(models.Model):
+    KIND_START = 'start'
+    KIND_STOP = 'stop'
+    KIND_CHOICES = [
+        (KIND_START, 'Начало рабочего дня'),
+        (KIND_STOP, 'Конец рабочего дня'),
+    ]
+
+    # Идентификатор события на устройстве: повторная отправка не дублирует отметку
+    clientEventId = models.CharField(max_length=100, unique=True)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    timestamp = models.DateTimeField()
+    # Местные дата и время отметки (как в WorkTimeTracking)
+    workDate = models.DateField()
+    workTime = models.TimeField()
+    # Пакет синхронизации, в котором событие получено
+    batch = models.CharField(max_length=32)
+    received = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['batch', 'employee', 'workDate']),
+        ]
+
+    def __str__(self):
+        return f"{self.clientEventId} - {self.kind}"
+
+# Остаток материала на объекте. Меняется только через движения
+# (MaterialMovement, см. stock.py), одна строка на пару (объект, название)
 class Material(models.Model):
     name = models.CharField(max_length=100)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     object = models.ForeignKey(Object, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['object', 'name'], name='unique_object_material'),
+        ]
+        # Поиск материалов ниже порога (см. stock.material_summary)
+        indexes = [
+            models.Index(fields=['amount']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+# Движение материала: приход на объект, расход с объекта,
+# перемещение между объектами или корректировка остатка
+class MaterialMovement(models.Model):
+    KIND_RECEIPT = 'receipt'
+    KIND_ISSUE = 'issue'
+    KIND_TRANSFER = 'transfer'
+    KIND_ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (KIND_RECEIPT, 'Приход'),
+        (KIND_ISSUE, 'Расход'),
+        (KIND_TRANSFER, 'Перемещение'),
+        (KIND_ADJUSTMENT, 'Корректировка'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    name = models.CharField(max_length=100)
+    # Для корректировки — изменение остатка со знаком
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    source = models.ForeignKey(Object, on_delete=models.SET_NULL, null=True, blank=True, related_name='outgoing_movements')
+    target = models.ForeignKey(Object, on_delete=models.SET_NULL, null=True, blank=True, related_name='incoming_movements')
+    date = models.DateTimeField(default=timezone.now)
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True)
+    comment = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id']),
+            models.Index(fields=['name', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.name} - {self.amount}"
+
+class ExportJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Готово'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    format = models.CharField(max_length=10)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    file = models.CharField(max_length=255, blank=True)
+    rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True)
+    finished = models.DateTimeField(null=True)
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.kind} #{self.id} - {self.status}"
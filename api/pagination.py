@@ -0,0 +1,30 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+# Курсорная пагинация по желанию клиента: включается параметром
+# page_size или cursor, без них список отдаётся целиком (как раньше).
+# Порядок задаётся атрибутом cursor_ordering представления
+class OptInCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', self.ordering)
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+
+# Результаты поиска упорядочены по релевантности, поэтому постранично
+# они отдаются через limit/offset
+class SearchResultsPagination(LimitOffsetPagination):
+    default_limit = 50
+    max_limit = 500
@@ -0,0 +1,88 @@
+from rest_framework.permissions import BasePermission
+from rest_framework.viewsets import ViewSetMixin
+
+# Стандартные действия ViewSet
+VIEWSET_ACTIONS = (
+    'list', 'retrieve', 'create', 'update',
+    'partial_update', 'destroy', 'metadata',
+)
+
+
+# Действия представления: для ViewSet — action, для APIView — HTTP-метод
+def view_actions(view_class):
+    if issubclass(view_class, ViewSetMixin):
+        actions = [name for name in VIEWSET_ACTIONS if name == 'metadata' or hasattr(view_class, name)]
+        actions += [action.__name__ for action in view_class.get_extra_actions()]
+        return actions
+    return [
+        method for method in view_class.http_method_names
+        if method != 'head' and hasattr(view_class, method)
+    ]
+
+# HEAD у APIView проверяется как GET (Django отвечает на HEAD методом get)
+def request_action(view, request):
+    action = getattr(view, 'action', None)
+    if action:
+        return action
+    method = request.method.lower()
+    return 'get' if method == 'head' else method
+
+
+# Матрица доступа (роль, представление, действие) -> разрешено.
+# Строится один раз при старте из allowed_roles представлений
+class PermissionRegistry:
+    def __init__(self):
+        self.roles = ()
+        self.views = {}
+        self._allowed = frozenset()
+
+    def build(self, view_classes, roles):
+        allowed = set()
+        views = {}
+        for view_class in view_classes:
+            name = view_class.__name__
+            actions = view_actions(view_class)
+            views[name] = actions
+            action_roles = getattr(view_class, 'action_roles', {})
+            for action in actions:
+                for role in action_roles.get(action, view_class.allowed_roles):
+                    allowed.add((role, name, action))
+
+        self.roles = tuple(roles)
+        self.views = views
+        self._allowed = frozenset(allowed)
+
+    def is_allowed(self, role, view_name, action):
+        return (role, view_name, action) in self._allowed
+
+    # Вся матрица для одной роли: {представление: {действие: bool}}
+    def matrix_for(self, role):
+        return {
+            name: {action: self.is_allowed(role, name, action) for action in actions}
+            for name, actions in self.views.items()
+        }
+
+
+registry = PermissionRegistry()
+
+def build_registry():
+    from django.views.generic import View
+
+    from . import views
+    from .management.commands.init import DEFAULT_ROLES
+
+    view_classes = [
+        obj for obj in vars(views).values()
+        if isinstance(obj, type) and issubclass(obj, View)
+        and obj.__module__ == views.__name__ and hasattr(obj, 'allowed_roles')
+    ]
+    registry.build(view_classes, [role['name'] for role in DEFAULT_ROLES])
+
+
+# Проверка доступа по матрице ролей
+class RolePermission(BasePermission):
+    def has_permission(self, request, view):
+        user = getattr(request, 'my_user', None)
+        if user is None or user.role is None:
+            return False
+        return registry.is_allowed(user.role.name, type(view).__name__, request_action(view, request))
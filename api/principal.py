@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .cache import aget_version, get_version, bump_version
+from .models import CustomUser
+from .sessions import ais_revoked, asession_cache_key, is_revoked, session_cache_key
+
+PRINCIPAL_VERSION = 'principal'
+
+
+def _cache_key(session_key, version=None):
+    if version is None:
+        version = get_version(PRINCIPAL_VERSION)
+    return f'principal:{version}:{session_key}'
+
+# Пользователь сессии вместе с ролью: одним запросом к БД,
+# затем короткое время из кеша. Всегда с основной БД — реплика
+# может ещё не знать о новом пользователе или смене роли
+def get_principal(request):
+    user_id = request.session.get('user_id')
+    if not user_id or is_revoked(request):
+        return None
+
+    session_key = session_cache_key(request)
+    key = _cache_key(session_key) if session_key else None
+    if key:
+        user = cache.get(key)
+        if user is not None and user.id == user_id:
+            return user
+
+    try:
+        user = CustomUser.objects.using(DEFAULT_DB_ALIAS).select_related('role').get(id=user_id)
+    except CustomUser.DoesNotExist:
+        return None
+
+    if key:
+        cache.set(key, user, settings.PRINCIPAL_CACHE_TIMEOUT)
+    return user
+
+# То же для async-представлений: сессия, кеш и БД без блокировки потока
+async def aget_principal(request):
+    user_id = await request.session.aget('user_id')
+    if not user_id or await ais_revoked(request):
+        return None
+
+    session_key = await asession_cache_key(request)
+    key = _cache_key(session_key, await aget_version(PRINCIPAL_VERSION)) if session_key else None
+    if key:
+        user = await cache.aget(key)
+        if user is not None and user.id == user_id:
+            return user
+
+    try:
+        user = await CustomUser.objects.using(DEFAULT_DB_ALIAS).select_related('role').aget(id=user_id)
+    except CustomUser.DoesNotExist:
+        return None
+
+    if key:
+        await cache.aset(key, user, settings.PRINCIPAL_CACHE_TIMEOUT)
+    return user
+
+# Сброс всех закешированных пользователей (при изменении пользователей или ролей)
+def invalidate_principals():
+    bump_version(PRINCIPAL_VERSION)
@@ -0,0 +1,156 @@
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+# Ограничение частоты запросов к открытым точкам (вход, заявки с сайта).
+# Для каждого правила из RATE_LIMITS два «ведра» токенов: на IP-адрес
+# и общее на точку. Состояние ведёр — в общем кеше; уже отклонённые
+# адреса до истечения блокировки отсекаются в процессе, без обращения к кешу
+
+# Сколько заблокированных ключей держать в памяти процесса
+LOCAL_BLOCK_LIMIT = 10000
+
+_blocked = {}
+_blocked_lock = threading.Lock()
+
+
+def _rules():
+    return settings.RATE_LIMITS if settings.RATE_LIMIT_ENABLED else {}
+
+def match_rule(request):
+    for name, rule in _rules().items():
+        if request.path == rule['path'] and request.method in rule['methods']:
+            return name, rule
+    return None, None
+
+def client_ip(request):
+    # За обратным прокси адрес клиента — последний в X-Forwarded-For
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+### БЛОКИРОВКИ В ПРОЦЕССЕ ###
+
+def _local_retry_after(keys, now):
+    with _blocked_lock:
+        waits = [_blocked[key] - now for key in keys if _blocked.get(key, 0) > now]
+    return max(waits) if waits else None
+
+def _block_locally(key, until):
+    with _blocked_lock:
+        if len(_blocked) >= LOCAL_BLOCK_LIMIT:
+            now = time.time()
+            for stale in [k for k, v in _blocked.items() if v <= now]:
+                del _blocked[stale]
+            if len(_blocked) >= LOCAL_BLOCK_LIMIT:
+                _blocked.clear()
+        _blocked[key] = until
+
+
+### ВЁДРА ТОКЕНОВ ###
+
+# Состояние ведра — (токены, время обновления). Чтение и запись идут
+# отдельными запросами к кешу, поэтому при одновременных запросах
+# из разных процессов лимит может быть превышен на несколько запросов
+def _buckets(name, rule, ip):
+    buckets = []
+    if rule.get('ip'):
+        buckets.append((f'ratelimit:{name}:ip:{ip}', *rule['ip']))
+    if rule.get('total'):
+        buckets.append((f'ratelimit:{name}:total', *rule['total']))
+    return buckets
+
+# Берёт по токену из всех ведёр правила. None — запрос разрешён,
+# иначе — через сколько секунд появится токен
+def take_token(name, rule, ip):
+    now = time.time()
+    buckets = _buckets(name, rule, ip)
+
+    retry_after = _local_retry_after([key for key, _, _ in buckets], now)
+    if retry_after is not None:
+        return retry_after
+
+    states = cache.get_many([key for key, _, _ in buckets])
+    updates = {}
+    for key, capacity, period in buckets:
+        rate = capacity / period
+        tokens, updated = states.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens < 1:
+            wait = (1 - tokens) / rate
+            _block_locally(key, now + wait)
+            return wait
+        updates[key] = (tokens - 1, now)
+
+    cache.set_many(updates, timeout=max(period for _, _, period in buckets) * 2)
+    return None
+
+
+### МЕТРИКИ ###
+
+def _rejected_key(name):
+    return f'ratelimit:rejected:{name}'
+
+def count_rejection(name):
+    key = _rejected_key(name)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+# Число отклонённых запросов по правилам (общее для всех процессов)
+def rejection_counts():
+    names = list(settings.RATE_LIMITS)
+    values = cache.get_many([_rejected_key(name) for name in names])
+    return {name: values.get(_rejected_key(name), 0) for name in names}
+
+
+### MIDDLEWARE ###
+
+# Проверка выполняется до сессий, CSRF и представлений —
+# отклонённый запрос не доходит ни до сериализатора, ни до БД.
+# Работает и под WSGI, и под ASGI (без перехода в поток для остальных запросов)
+class RateLimitMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        name, rule = match_rule(request)
+        if rule is not None:
+            retry_after = take_token(name, rule, client_ip(request))
+            if retry_after is not None:
+                count_rejection(name)
+                return self.too_many_requests(retry_after)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        name, rule = match_rule(request)
+        if rule is not None:
+            retry_after = await sync_to_async(take_token)(name, rule, client_ip(request))
+            if retry_after is not None:
+                await sync_to_async(count_rejection)(name)
+                return self.too_many_requests(retry_after)
+        return await self.get_response(request)
+
+    def too_many_requests(self, retry_after):
+        response = JsonResponse({'error': 'Слишком много запросов, повторите позже'}, status=429)
+        response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
@@ -0,0 +1,96 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DateField, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db import transaction
+from django.db.models.functions import Trunc
+
+from .cache import get_version_info, bump_version
+from .filters import filter_work_time, parse_date_range
+from .models import WorkTimeTracking
+from .routing import fresh_reads
+
+# Версия учёта времени за прошедшие дни. Отметки за сегодня её не меняют,
+# поэтому отчёты за закрытые периоды не сбрасываются при каждой отметке
+CLOSED_WORK_TIME_VERSION = 'work_time:closed'
+
+REPORT_PERIODS = ('day', 'week', 'month')
+
+
+# Сброс отчётов за закрытые периоды после коммита. Кроме записей учёта
+# отчёт показывает ФИО, табельный номер и текущий объект сотрудника
+# и название объекта — их изменение тоже сбрасывает (см. signals.py)
+def invalidate_closed_reports():
+    transaction.on_commit(lambda: bump_version(CLOSED_WORK_TIME_VERSION))
+
+# Изменены записи за даты dates (вызывается сигналами и после update, bulk_create).
+# Версия сбрасывается, если среди дат есть прошедшие
+def invalidate_work_time(dates):
+    if any(day < date.today() for day in dates):
+        invalidate_closed_reports()
+
+
+# Группировки отчёта: имя -> поля результата
+REPORT_GROUPS = {
+    'employee': {
+        'personnelNumber': F('employee__personnelNumber'),
+        'fullName': F('employee__fullName'),
+    },
+    'object': {
+        'object': F('employee__object__name'),
+    },
+}
+
+
+def _hours(duration):
+    return round(duration.total_seconds() / 3600, 2) if duration else 0
+
+# Часы по сотрудникам/объектам за день, неделю или месяц — считаются в БД
+def hours_report(params, period='day', group_by=('employee',)):
+    queryset = filter_work_time(WorkTimeTracking.objects.all(), params)
+
+    if period == 'day':
+        queryset = queryset.annotate(period=F('date'))
+    else:
+        queryset = queryset.annotate(period=Trunc('date', period, output_field=DateField()))
+
+    group_fields = {}
+    for group in group_by:
+        group_fields.update(REPORT_GROUPS[group])
+
+    duration = ExpressionWrapper(F('endTime') - F('startTime'), output_field=DurationField())
+    rows = (
+        queryset
+        .values('period', **group_fields)
+        .annotate(
+            shifts=Count('id'),
+            totalDuration=Sum(duration),
+            lateStarts=Count('id', filter=Q(startTime__gt=settings.WORK_DAY_START)),
+            openShifts=Count('id', filter=Q(endTime__isnull=True)),
+        )
+        .order_by('period', *group_fields)
+    )
+
+    result = []
+    for row in rows:
+        row['totalHours'] = _hours(row.pop('totalDuration'))
+        result.append(row)
+    return result
+
+# Отчёт с кешированием: за закрытый период (dateTo раньше сегодняшнего дня)
+# результат берётся из кеша, пока не изменятся записи за прошедшие дни
+def cached_hours_report(params, period='day', group_by=('employee',)):
+    _, date_to = parse_date_range(params)
+    if not date_to or date_to >= date.today():
+        return hours_report(params, period, group_by)
+
+    version, modified = get_version_info(CLOSED_WORK_TIME_VERSION)
+    key_params = ':'.join(f'{name}={params[name]}' for name in sorted(params))
+    key = f'report:hours:{version}:{period}:{",".join(group_by)}:{key_params}'
+    result = cache.get(key)
+    if result is None:
+        with fresh_reads(modified):
+            result = hours_report(params, period, group_by)
+        cache.set(key, result, settings.REPORT_CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,118 @@
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import Trunc, TruncDate
+from django.utils import timezone
+
+from .models import ApplicationDailyStat, ClientsApplication, ClientsApplicationStatus
+
+DASHBOARD_PERIODS = ('day', 'week', 'month')
+
+
+# Ключ сводки для заявки: (день, тип, статус).
+# Значения берутся из __dict__, чтобы не подгружать отложенные поля;
+# незагруженные берутся из fallback (ключа, запомненного ранее)
+def application_key(instance, fallback=None):
+    values = instance.__dict__
+    key = []
+    for index, field in enumerate(('date', 'type_id', 'status_id')):
+        if field in values:
+            key.append(values[field])
+        elif fallback is not None:
+            key.append(fallback[index])
+        else:
+            return None
+    if key[0] is None:
+        return None
+    if isinstance(key[0], datetime):
+        key[0] = timezone.localdate(key[0])
+    return tuple(key)
+
+# Изменение счётчика одного ключа: UPDATE, а если строки ещё нет — INSERT
+def apply_application_delta(key, delta):
+    day, type_id, status_id = key
+    row_id = (
+        ApplicationDailyStat.objects
+        .filter(date=day, type_id=type_id, status_id=status_id)
+        .values_list('id', flat=True)
+        .first()
+    )
+    if row_id is not None:
+        ApplicationDailyStat.objects.filter(id=row_id).update(count=F('count') + delta)
+    else:
+        ApplicationDailyStat.objects.create(date=day, type_id=type_id, status_id=status_id, count=delta)
+
+# Пакетное обновление сводки (например, после bulk_create заявок)
+def apply_applications(keys, delta=1):
+    counts = {}
+    for key in keys:
+        counts[key] = counts.get(key, 0) + delta
+    with transaction.atomic():
+        for key, count in counts.items():
+            if count:
+                apply_application_delta(key, count)
+
+# Полный пересчёт сводки по таблице заявок
+@transaction.atomic
+def rebuild_application_stats():
+    ApplicationDailyStat.objects.all().delete()
+    rows = (
+        ClientsApplication.objects
+        .annotate(day=TruncDate('date'))
+        .values('day', 'type_id', 'status_id')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    stats = ApplicationDailyStat.objects.bulk_create([
+        ApplicationDailyStat(date=row['day'], type_id=row['type_id'], status_id=row['status_id'], count=row['count'])
+        for row in rows
+    ], batch_size=500)
+    return len(stats)
+
+
+# Панель заявок по сводке: по статусам, типам, дням/неделям/месяцам и воронка
+def application_dashboard(date_from=None, date_to=None, period='day'):
+    queryset = ApplicationDailyStat.objects.all()
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+
+    # Сумма счётчиков по одному выражению; name — имя поля в ответе
+    def grouped(name, expression):
+        rows = (
+            queryset
+            .values(key=expression)
+            .annotate(count=Sum('count'))
+            .filter(count__gt=0)
+            .order_by('key')
+        )
+        return [{name: row['key'], 'count': row['count']} for row in rows]
+
+    if period == 'day':
+        by_period = grouped('period', F('date'))
+    else:
+        by_period = grouped('period', Trunc('date', period, output_field=DateField()))
+
+    by_status = grouped('status', F('status__name'))
+    counts = {row['status']: row['count'] for row in by_status}
+    total = sum(counts.values())
+
+    # Воронка: статусы в порядке создания, доля от всех заявок за период
+    funnel = [
+        {
+            'status': name,
+            'count': counts.get(name, 0),
+            'share': round(counts.get(name, 0) / total, 4) if total else 0,
+        }
+        for name in ClientsApplicationStatus.objects.order_by('id').values_list('name', flat=True)
+    ]
+
+    return {
+        'total': total,
+        'byStatus': by_status,
+        'byType': grouped('type', F('type__name')),
+        'byPeriod': by_period,
+        'funnel': funnel,
+    }
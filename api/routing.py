@@ -0,0 +1,156 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.deprecation import MiddlewareMixin
+
+# Чтение с реплики. Представление объявляет read_preference = 'replica',
+# и безопасные запросы (GET/HEAD) к нему читают модели api с реплики.
+# Запись и всё остальное — с основной БД. Клиент, который только что
+# что-то изменил, некоторое время читает с основной (cookie REPLICA_PIN_COOKIE),
+# а при отставании реплики больше REPLICA_MAX_LAG чтение тоже идёт с основной
+
+READ_PRIMARY = 'primary'
+READ_REPLICA = 'replica'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Ключи в общем кеше: время последней записи и последней синхронизации реплики
+PRIMARY_WRITE_KEY = 'replica:primary_write'
+REPLICA_SYNCED_KEY = 'replica:synced'
+
+_read_alias = ContextVar('read_alias', default=None)
+
+_lag_lock = threading.Lock()
+_lag_checked = (0.0, None)  # (когда проверяли, отставание)
+
+
+def replica_configured():
+    return settings.REPLICA_DB_ALIAS in settings.DATABASES
+
+
+### ОТСТАВАНИЕ РЕПЛИКИ ###
+
+def record_primary_write():
+    cache.set(PRIMARY_WRITE_KEY, time.time(), timeout=None)
+
+def record_replica_sync(synced_at):
+    cache.set(REPLICA_SYNCED_KEY, synced_at, timeout=None)
+
+# Postgres: реплика догнала основную — 0, иначе время с последней применённой транзакции
+POSTGRES_LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+def _measure_lag():
+    connection = connections[settings.REPLICA_DB_ALIAS]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(POSTGRES_LAG_SQL)
+            lag = cursor.fetchone()[0]
+        return float(lag) if lag is not None else None
+
+    # Копия SQLite (sync_replica): отстаёт, если после копирования была запись
+    values = cache.get_many([PRIMARY_WRITE_KEY, REPLICA_SYNCED_KEY])
+    synced = values.get(REPLICA_SYNCED_KEY)
+    if synced is None:
+        return None
+    written = values.get(PRIMARY_WRITE_KEY, 0)
+    return time.time() - synced if written > synced else 0.0
+
+# Отставание в секундах (None — неизвестно), проверяется не чаще
+# раза в REPLICA_LAG_CHECK_INTERVAL секунд на процесс
+def replica_lag():
+    global _lag_checked
+    now = time.monotonic()
+    checked, lag = _lag_checked
+    if now - checked < settings.REPLICA_LAG_CHECK_INTERVAL:
+        return lag
+    with _lag_lock:
+        try:
+            lag = _measure_lag()
+        except DatabaseError:
+            lag = None
+        _lag_checked = (now, lag)
+    return lag
+
+def replica_available():
+    lag = replica_lag()
+    return lag is not None and lag <= settings.REPLICA_MAX_LAG
+
+
+# Кеши и ETag по версиям данных: если версия сменилась недавно, реплика могла
+# ещё не получить изменение, и устаревшие строки попали бы в кеш под новой
+# версией. Такие данные читаются с основной БД (modified — время смены версии)
+def replica_may_be_behind(modified):
+    return time.time() - modified < settings.REPLICA_MAX_LAG + settings.REPLICA_LAG_CHECK_INTERVAL
+
+@contextmanager
+def fresh_reads(modified):
+    if _read_alias.get() is None or not replica_may_be_behind(modified):
+        yield
+        return
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+### РОУТЕР ###
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'api':
+            return _read_alias.get()
+        return None
+
+    # Время записи нужно для оценки отставания копии SQLite
+    def db_for_write(self, model, **hints):
+        if replica_configured():
+            record_primary_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    # Реплика получает схему вместе с данными, миграции — только на основной
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != settings.REPLICA_DB_ALIAS
+
+
+### MIDDLEWARE ###
+
+def _view_read_preference(view_func):
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+    initkwargs = getattr(view_func, 'view_initkwargs', None) or getattr(view_func, 'initkwargs', None) or {}
+    return initkwargs.get('read_preference') or getattr(view_class, 'read_preference', READ_PRIMARY)
+
+class ReadPreferenceMiddleware(MiddlewareMixin):
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in SAFE_METHODS
+            and replica_configured()
+            and _view_read_preference(view_func) == READ_REPLICA
+            and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+            and replica_available()
+        ):
+            _read_alias.set(settings.REPLICA_DB_ALIAS)
+        return None
+
+    def process_response(self, request, response):
+        # Потоковый ответ дочитывается уже после сброса — с основной БД
+        _read_alias.set(None)
+
+        # Чтение своих записей: после успешного изменения — с основной БД
+        if replica_configured() and request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
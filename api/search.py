@@ -0,0 +1,78 @@
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Полнотекстовый индекс заявок в SQLite: FTS5 с триграммным токенизатором
+# (поиск по фрагментам ФИО, телефона и текста). Заполняется триггерами
+FTS_TABLE = 'api_clientsapplication_fts'
+
+# Телефон без оформления: поиск по цифрам "9991234567" находит "+7 (999) 123-45-67"
+def phone_digits_sql(column):
+    sql = column
+    for char in (' ', '-', '(', ')', '+'):
+        sql = f"replace({sql}, '{char}', '')"
+    return sql
+
+_fts_ready = None
+
+def fts_available():
+    global _fts_ready
+    if _fts_ready is None:
+        _fts_ready = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_ready
+
+# Запрос FTS5: каждое слово — фраза в кавычках, все слова обязательны.
+# Триграммный индекс ищет фрагменты от 3 символов
+def fts_query(text):
+    terms = [term for term in text.split() if len(term) >= 3]
+    return ' AND '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+def _fallback_search(queryset, text):
+    condition = Q()
+    for term in text.split():
+        condition &= (
+            Q(fullName__icontains=term)
+            | Q(phoneNumber__contains=term)
+            | Q(description__icontains=term)
+        )
+    return queryset.filter(condition).order_by('-date', '-id')
+
+def _sqlite_search(queryset, text):
+    query = fts_query(text)
+    if not query:
+        return _fallback_search(queryset, text)
+
+    table = queryset.model._meta.db_table
+    return (
+        queryset
+        .filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query]))
+        .annotate(rank=RawSQL(
+            f'SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            [query],
+        ))
+        .order_by('rank', '-id')
+    )
+
+# В Postgres: отбор через ILIKE по триграммным GIN-индексам, ранжирование по tsvector
+def _postgres_search(queryset, text):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    vector = SearchVector('fullName', 'phoneNumber', 'description', config='simple')
+    query = SearchQuery(text, config='simple', search_type='websearch')
+    return (
+        _fallback_search(queryset, text)
+        .annotate(rank=SearchRank(vector, query))
+        .order_by('-rank', '-date', '-id')
+    )
+
+# Поиск заявок по ФИО, фрагменту телефона и тексту, результаты по релевантности
+def search_applications(queryset, text):
+    if connection.vendor == 'postgresql':
+        return _postgres_search(queryset, text)
+    if fts_available():
+        return _sqlite_search(queryset, text)
+    return _fallback_search(queryset, text)
@@ -1,10 +1,16 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import F
+from django.utils.encoding import smart_str
 from rest_framework import serializers
+
+from . import lookups
 from .models import (
     CustomUser, 
     Employee,
     JobTitle,
     Object,
     Material,
+    MaterialMovement,
     ClientsApplicationType,
     ClientsApplicationStatus, 
     ClientsApplication, 
@@ -13,6 +19,20 @@ from .models import (
 )
 
 
+# SlugRelatedField по названию, который берёт строку из кеша справочника
+class NameLookupRelatedField(serializers.SlugRelatedField):
+    def __init__(self, lookup, **kwargs):
+        self.lookup = lookup
+        kwargs.setdefault('slug_field', 'name')
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            return self.lookup.get(smart_str(data))
+        except ObjectDoesNotExist:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=smart_str(data))
+
+
 ### ПОЛЬЗОВАТЕЛИ ###
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -34,14 +54,14 @@ class CustomUserSerializer(serializers.ModelSerializer):
 
     def validate_role(self, value):
         """Проверяем существование роли"""
-        if not Role.objects.filter(name=value).exists():
+        if not lookups.roles.exists(value):
             raise serializers.ValidationError("Роль с таким названием не существует")
         return value
 
     def create(self, validated_data):
         # Получаем объект роли по названию
         role_name = validated_data.pop('role')
-        role = Role.objects.get(name=role_name)
+        role = lookups.roles.get(role_name)
         
         # Создаем пользователя
         password = validated_data.pop('password')
@@ -93,16 +113,14 @@ class EmployeeSerializer(serializers.ModelSerializer):
         return user
 
     def validate_jobTitle(self, value):
-        from .models import JobTitle
         try:
-            return JobTitle.objects.get(name=value)
+            return lookups.job_titles.get(value)
         except JobTitle.DoesNotExist:
             raise serializers.ValidationError("Должность с таким названием не найдена.")
 
     def validate_object(self, value):
-        from .models import Object
         try:
-            return Object.objects.get(name=value)
+            return lookups.objects.get(value)
         except Object.DoesNotExist:
             raise serializers.ValidationError("Объект с таким названием не найден.")
 
@@ -149,8 +167,8 @@ class ObjectSerializer(serializers.ModelSerializer):
 ### МАТЕРИАЛЫ ###
 
 class MaterialSerializer(serializers.ModelSerializer):
-    object = serializers.SlugRelatedField(
-        slug_field='name',
+    object = NameLookupRelatedField(
+        lookups.objects,
         queryset=Object.objects.all()
     )
     object_data = ObjectSerializer(source='object', read_only=True)
@@ -158,6 +176,53 @@ class MaterialSerializer(serializers.ModelSerializer):
     class Meta:
         model = Material
         fields = ['id', 'name', 'amount', 'object', 'object_data']
+        # Повторное добавление того же материала — это приход (см. MaterialViewSet.create)
+        validators = []
+
+class MaterialMovementSerializer(serializers.ModelSerializer):
+    source = NameLookupRelatedField(
+        lookups.objects,
+        queryset=Object.objects.all(),
+        required=False,
+        allow_null=True
+    )
+    target = NameLookupRelatedField(
+        lookups.objects,
+        queryset=Object.objects.all(),
+        required=False,
+        allow_null=True
+    )
+    user = serializers.SlugRelatedField(slug_field='login', read_only=True)
+
+    class Meta:
+        model = MaterialMovement
+        fields = ['id', 'kind', 'name', 'amount', 'source', 'target', 'date', 'user', 'comment']
+        read_only_fields = ['date']
+
+    def validate(self, data):
+        kind = data['kind']
+        source = data.get('source')
+        target = data.get('target')
+
+        if kind == MaterialMovement.KIND_ADJUSTMENT:
+            if data['amount'] == 0:
+                raise serializers.ValidationError({'amount': 'Корректировка не может быть нулевой'})
+        elif data['amount'] <= 0:
+            raise serializers.ValidationError({'amount': 'Количество должно быть больше нуля'})
+
+        if kind in (MaterialMovement.KIND_ISSUE, MaterialMovement.KIND_TRANSFER) and source is None:
+            raise serializers.ValidationError({'source': 'Укажите объект, с которого списывается материал'})
+        if kind in (MaterialMovement.KIND_RECEIPT, MaterialMovement.KIND_TRANSFER, MaterialMovement.KIND_ADJUSTMENT) and target is None:
+            raise serializers.ValidationError({'target': 'Укажите объект, на который поступает материал'})
+        if kind == MaterialMovement.KIND_TRANSFER and source == target:
+            raise serializers.ValidationError({'target': 'Объекты перемещения должны различаться'})
+
+        # Лишний объект для прихода/расхода не сохраняем
+        if kind == MaterialMovement.KIND_ISSUE:
+            data['target'] = None
+        elif kind != MaterialMovement.KIND_TRANSFER:
+            data['source'] = None
+        return data
 
 ### ЗАЯВКИ ###
 
@@ -175,16 +240,16 @@ class ClientsApplicationSerializer(serializers.ModelSerializer):
     type = ClientsApplicationTypeSerializer(read_only=True)
     status = ClientsApplicationStatusSerializer(read_only=True)
     
-    type_name = serializers.SlugRelatedField(
+    type_name = NameLookupRelatedField(
+        lookups.application_types,
         queryset=ClientsApplicationType.objects.all(),
-        slug_field='name',
         source='type',
         write_only=True,
         required=False
     )
-    status_name = serializers.SlugRelatedField(
+    status_name = NameLookupRelatedField(
+        lookups.application_statuses,
         queryset=ClientsApplicationStatus.objects.all(),
-        slug_field='name',
         source='status',
         write_only=True,
         required=False
@@ -196,6 +261,7 @@ class ClientsApplicationSerializer(serializers.ModelSerializer):
             'id', 'fullName', 'phoneNumber', 'description', 
             'date', 'type', 'status', 'type_name', 'status_name'
         ]
+        read_only_fields = ['date']
 
 
 ### WTT ###
@@ -227,6 +293,17 @@ class WorkTimeTrackingSerializer(serializers.ModelSerializer):
         validated_data.pop('personnelNumber', None)
         return super().update(instance, validated_data)
 
+# Плоское представление для списка учёта времени: одна выборка с join,
+# только поля, которые показывает интерфейс (без паспорта и реквизитов)
+def work_time_list_values(queryset):
+    return queryset.values(
+        'id', 'date', 'startTime', 'endTime',
+        personnelNumber=F('employee__personnelNumber'),
+        fullName=F('employee__fullName'),
+        jobTitle=F('employee__jobTitle__name'),
+        object=F('employee__object__name'),
+    )
+
 class StartWorkSerializer(serializers.Serializer):
     personnelNumber = serializers.CharField()
 
@@ -246,6 +323,19 @@ class EndWorkSerializer(serializers.Serializer):
             raise serializers.ValidationError("Сотрудник с таким табельным номером не найден")
 
 
+# Бригада: список табельных номеров или все сотрудники объекта
+class CrewWorkSerializer(serializers.Serializer):
+    personnelNumbers = serializers.ListField(
+        child=serializers.CharField(), required=False, allow_empty=False, max_length=1000
+    )
+    object = serializers.CharField(required=False)
+
+    def validate(self, data):
+        if not data.get('personnelNumbers') and not data.get('object'):
+            raise serializers.ValidationError("Укажите personnelNumbers или object")
+        return data
+
+
 ### Роли ###
 
 class RoleSerializer(serializers.ModelSerializer):
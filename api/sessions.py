@@ -0,0 +1,47 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# В сессии хранятся только user_id и идентификатор входа sid.
+# sid нужен для отзыва сессии: подписанную cookie нельзя удалить на сервере
+SESSION_ID_KEY = 'sid'
+
+
+def _revoked_key(sid):
+    return f'session:revoked:{sid}'
+
+# Вход: записываем пользователя в сессию
+def start_session(request, user):
+    request.session['user_id'] = user.id
+    request.session[SESSION_ID_KEY] = uuid.uuid4().hex
+
+async def astart_session(request, user):
+    await request.session.aset('user_id', user.id)
+    await request.session.aset(SESSION_ID_KEY, uuid.uuid4().hex)
+
+# Выход: убираем пользователя из сессии и заносим вход в список отозванных
+def end_session(request):
+    sid = request.session.pop(SESSION_ID_KEY, None)
+    if sid and settings.SESSION_REVOCATION:
+        cache.set(_revoked_key(sid), True, settings.SESSION_COOKIE_AGE)
+    request.session.pop('user_id', None)
+
+def is_revoked(request):
+    if not settings.SESSION_REVOCATION:
+        return False
+    sid = request.session.get(SESSION_ID_KEY)
+    return bool(sid) and cache.get(_revoked_key(sid), False)
+
+async def ais_revoked(request):
+    if not settings.SESSION_REVOCATION:
+        return False
+    sid = await request.session.aget(SESSION_ID_KEY)
+    return bool(sid) and await cache.aget(_revoked_key(sid), False)
+
+# Ключ сессии для кешей: sid стабилен и короток даже для подписанных cookie
+def session_cache_key(request):
+    return request.session.get(SESSION_ID_KEY) or request.session.session_key
+
+async def asession_cache_key(request):
+    return await request.session.aget(SESSION_ID_KEY) or request.session.session_key
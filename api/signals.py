@@ -0,0 +1,116 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_version
+from .conditional import table_version_name
+from .models import (
+    CustomUser,
+    Role,
+    Employee,
+    WorkTimeTracking,
+    Material,
+    JobTitle,
+    Object,
+    ClientsApplication,
+    ClientsApplicationType,
+    ClientsApplicationStatus,
+)
+from .principal import invalidate_principals
+from .reports import invalidate_closed_reports, invalidate_work_time
+from .rollups import application_key, apply_application_delta, rebuild_application_stats
+from .stock import invalidate_materials
+
+
+# Версии сбрасываются после коммита: иначе другой процесс может успеть
+# перечитать ещё не изменённые строки и закешировать их под новой версией
+# (удаление, например, выполняется в транзакции Collector)
+
+### ПОЛЬЗОВАТЕЛИ И РОЛИ ###
+
+@receiver([post_save, post_delete], sender=CustomUser)
+@receiver([post_save, post_delete], sender=Role)
+def reset_principal_cache(sender, **kwargs):
+    transaction.on_commit(invalidate_principals)
+
+
+### WTT ###
+
+@receiver([post_save, post_delete], sender=WorkTimeTracking)
+def bump_work_time_version(sender, instance, **kwargs):
+    invalidate_work_time([instance.date])
+
+# ФИО, табельный номер и объект сотрудника, название объекта — в отчёте по часам
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=Object)
+def reset_closed_reports(sender, **kwargs):
+    invalidate_closed_reports()
+
+
+### МАТЕРИАЛЫ ###
+
+# Движения меняют остатки через F() и сбрасывают версию сами (см. stock.py).
+# Сводка показывает и фильтрует по названию объекта — его смена тоже сбрасывает
+@receiver([post_save, post_delete], sender=Material)
+@receiver([post_save, post_delete], sender=Object)
+def bump_material_version(sender, **kwargs):
+    invalidate_materials()
+
+
+### ЗАЯВКИ ###
+
+# Сводка по заявкам (rollups.py) обновляется на разницу:
+# ключ (день, тип, статус) запоминается при загрузке и после сохранения
+@receiver(post_init, sender=ClientsApplication)
+def remember_application_key(sender, instance, **kwargs):
+    instance._rollup_key = application_key(instance)
+
+def _stored_application_key(instance):
+    # Заявка загружена без нужных полей — старый ключ берём из БД
+    if instance._rollup_key is None:
+        old = type(instance).objects.only('date', 'type', 'status').filter(pk=instance.pk).first()
+        instance._rollup_key = application_key(old) if old else None
+    return instance._rollup_key
+
+@receiver(pre_save, sender=ClientsApplication)
+def load_application_key(sender, instance, **kwargs):
+    if not instance._state.adding:
+        _stored_application_key(instance)
+
+@receiver(post_save, sender=ClientsApplication)
+def update_application_stats(sender, instance, created, **kwargs):
+    old_key = None if created else instance._rollup_key
+    new_key = application_key(instance, old_key)
+    if old_key != new_key:
+        if old_key:
+            apply_application_delta(old_key, -1)
+        if new_key:
+            apply_application_delta(new_key, 1)
+    instance._rollup_key = new_key
+
+# Удаление выполняется в транзакции, строка ещё в БД
+@receiver(pre_delete, sender=ClientsApplication)
+def remove_application_stats(sender, instance, **kwargs):
+    key = application_key(instance, _stored_application_key(instance))
+    if key:
+        apply_application_delta(key, -1)
+
+# При удалении типа или статуса заявки меняются массовым UPDATE (SET NULL),
+# поэтому сводка пересчитывается целиком
+@receiver(post_delete, sender=ClientsApplicationType)
+@receiver(post_delete, sender=ClientsApplicationStatus)
+def rebuild_stats_on_reference_delete(sender, **kwargs):
+    rebuild_application_stats()
+
+
+### СПРАВОЧНИКИ ###
+
+# Версии таблиц для ETag/Last-Modified (см. conditional.py)
+@receiver([post_save, post_delete], sender=Role)
+@receiver([post_save, post_delete], sender=JobTitle)
+@receiver([post_save, post_delete], sender=Object)
+@receiver([post_save, post_delete], sender=ClientsApplicationType)
+@receiver([post_save, post_delete], sender=ClientsApplicationStatus)
+def bump_reference_version(sender, **kwargs):
+    name = table_version_name(sender)
+    transaction.on_commit(lambda: bump_version(name))
@@ -34,7 +34,7 @@ document.getElementById("application-form").addEventListener("submit", async fun
         })
         });
 
-        if (response.status === 201) {
+        if (response.status === 201 || response.status === 202) {
         alert("Заявка успешно отправлена!");
         document.getElementById("application-form").reset();
         } else {
@@ -61,33 +61,9 @@ document.addEventListener('DOMContentLoaded', () => {
   }
   window.closeModal = closeAllModals;
 
-  async function fetchApplications() {
-    try {
-      const response = await fetch('/api/applications/', {
-        credentials: 'include'
-      });
-      if (!response.ok) throw new Error();
-      return await response.json();
-    } catch (error) {
-      console.error('Ошибка загрузки заявок:', error);
-      modals.error.classList.remove('hidden');
-      return [];
-    }
-  }
-
+  // Таблица заполняется постранично в applicationsList.js
   async function updateTable() {
-    const applications = await fetchApplications();
-    table.body.innerHTML = applications.map(app => `
-      <tr>
-        <td>${app.id}</td>
-        <td>${app.fullName}</td>
-        <td>${app.phoneNumber}</td>
-        <td>${app.description}</td>
-        <td>${app.type?.name || ''}</td>
-        <td>${app.status?.name || ''}</td>
-        <td>${new Date(app.date).toLocaleDateString()}</td>
-      </tr>
-    `).join('');
+    await window.reloadApplicationsList();
   }
 
   async function populateSelectOptions() {
@@ -236,7 +212,6 @@ document.addEventListener('DOMContentLoaded', () => {
   // Инициализация
   async function init() {
     await populateSelectOptions();
-    await updateTable();
   }
 
   init();
@@ -1,8 +1,21 @@
+// Список загружается постранично (курсорная пагинация API),
+// следующая страница подгружается при прокрутке к концу таблицы
+const PAGE_SIZE = 50;
+let nextPageUrl = null;
+// Запрос текущей страницы. Перезагрузка списка отменяет его, чтобы
+// старый ответ не сбил курсор и не дописал строки в очищенную таблицу
+let pageController = null;
+
 async function fetchApplications() {
+    if (!nextPageUrl || pageController) return;
+    const controller = new AbortController();
+    pageController = controller;
+
     try {
-      const response = await fetch('/api/applications/', {
+      const response = await fetch(nextPageUrl, {
         method: 'GET',
         credentials: 'include',
+        signal: controller.signal,
         headers: {
           'Content-Type': 'application/json'
         }
@@ -14,11 +27,12 @@ async function fetchApplications() {
       }
 
       const data = await response.json();
+      if (controller.signal.aborted) return;
+      nextPageUrl = data.next;
 
       const tableBody = document.getElementById("application-table-body");
-      tableBody.innerHTML = ""; // очищаем старые данные
 
-      data.forEach(app => {
+      data.results.forEach(app => {
         const row = document.createElement("tr");
 
         row.innerHTML = `
@@ -26,8 +40,8 @@ async function fetchApplications() {
           <td>${app.fullName}</td>
           <td>${app.phoneNumber}</td>
           <td>${app.description}</td>
-          <td>${app.type.name}</td>
-          <td>${app.status.name}</td>
+          <td>${app.type?.name || ''}</td>
+          <td>${app.status?.name || ''}</td>
           <td>${new Date(app.date).toLocaleString('ru-RU', {
               day: '2-digit',
               month: '2-digit',
@@ -41,8 +55,27 @@ async function fetchApplications() {
       });
 
     } catch (error) {
+      if (error.name === 'AbortError') return;
       console.error("Ошибка сети при получении заявок:", error);
+    } finally {
+      if (pageController === controller) pageController = null;
     }
   }
 
-  document.addEventListener('DOMContentLoaded', fetchApplications);
\ No newline at end of file
+  // Перезагрузка списка с первой страницы (используется и после изменений)
+  async function reloadApplicationsList() {
+    pageController?.abort();
+    pageController = null;
+    nextPageUrl = `/api/applications/?page_size=${PAGE_SIZE}`;
+    document.getElementById("application-table-body").innerHTML = ""; // очищаем старые данные
+    await fetchApplications();
+  }
+  window.reloadApplicationsList = reloadApplicationsList;
+
+  window.addEventListener('scroll', () => {
+    if (window.innerHeight + window.scrollY >= document.body.offsetHeight - 200) {
+      fetchApplications();
+    }
+  });
+
+  document.addEventListener('DOMContentLoaded', reloadApplicationsList);
\ No newline at end of file
@@ -1,8 +1,21 @@
+// Список загружается постранично (курсорная пагинация API),
+// следующая страница подгружается при прокрутке к концу таблицы
+const PAGE_SIZE = 50;
+let nextPageUrl = null;
+// Запрос текущей страницы. Перезагрузка списка отменяет его, чтобы
+// старый ответ не сбил курсор и не дописал строки в очищенную таблицу
+let pageController = null;
+
 async function fetchApplications() {
+    if (!nextPageUrl || pageController) return;
+    const controller = new AbortController();
+    pageController = controller;
+
     try {
-      const response = await fetch('/api/employees/', {
+      const response = await fetch(nextPageUrl, {
         method: 'GET',
         credentials: 'include',
+        signal: controller.signal,
         headers: {
           'Content-Type': 'application/json'
         }
@@ -14,11 +27,12 @@ async function fetchApplications() {
       }
 
       const data = await response.json();
+      if (controller.signal.aborted) return;
+      nextPageUrl = data.next;
 
       const tableBody = document.getElementById("employeers-table-body");
-      tableBody.innerHTML = ""; // очищаем старые данные
 
-      data.forEach(app => {
+      data.results.forEach(app => {
         const row = document.createElement("tr");
 
         row.innerHTML = `
@@ -26,7 +40,7 @@ async function fetchApplications() {
           <td>${app.fullName}</td>
           <td>${app.personnelNumber}</td>
           <td>${app.phoneNumber}</td>
-          <td>${app.email}</td>\
+          <td>${app.email}</td>
           <td>${app.bankDetails}</td>
           <td>${app.passport}</td>
           <td>${app.jobTitle}</td>
@@ -38,8 +52,27 @@ async function fetchApplications() {
       });
 
     } catch (error) {
+      if (error.name === 'AbortError') return;
       console.error("Ошибка сети при получении сотрудников:", error);
+    } finally {
+      if (pageController === controller) pageController = null;
     }
   }
 
-  document.addEventListener('DOMContentLoaded', fetchApplications);
\ No newline at end of file
+  // Перезагрузка списка с первой страницы (используется и после изменений)
+  async function reloadEmployeesList() {
+    pageController?.abort();
+    pageController = null;
+    nextPageUrl = `/api/employees/?page_size=${PAGE_SIZE}`;
+    document.getElementById("employeers-table-body").innerHTML = ""; // очищаем старые данные
+    await fetchApplications();
+  }
+  window.reloadEmployeesList = reloadEmployeesList;
+
+  window.addEventListener('scroll', () => {
+    if (window.innerHeight + window.scrollY >= document.body.offsetHeight - 200) {
+      fetchApplications();
+    }
+  });
+
+  document.addEventListener('DOMContentLoaded', reloadEmployeesList);
\ No newline at end of file
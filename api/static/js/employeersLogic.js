@@ -81,36 +81,9 @@ document.addEventListener('DOMContentLoaded', () => {
   }
   window.closeModal = closeAllModals;
 
-  async function fetchApplications() {
-    try {
-      const response = await fetch('/api/employees/', {
-        credentials: 'include'
-      });
-      if (!response.ok) throw new Error();
-      return await response.json();
-    } catch (error) {
-      console.error('Ошибка загрузки сотрудников:', error);
-      modals.error.classList.remove('hidden');
-      return [];
-    }
-  }
-
+  // Таблица заполняется постранично в employeersList.js
   async function updateTable() {
-    const applications = await fetchApplications();
-    table.body.innerHTML = applications.map(app => `
-      <tr>
-          <td>${app.id}</td>
-          <td>${app.fullName}</td>
-          <td>${app.personnelNumber}</td>
-          <td>${app.phoneNumber}</td>
-          <td>${app.email}</td>\
-          <td>${app.bankDetails}</td>
-          <td>${app.passport}</td>
-          <td>${app.jobTitle}</td>
-          <td>${app.object}</td>
-          <td>${app.user}</td>
-      </tr>
-    `).join('');
+    await window.reloadEmployeesList();
   }
 
 async function populateSelectOptions() {
@@ -329,7 +302,6 @@ async function populateSelectOptions() {
   // Инициализация
   async function init() {
     await populateSelectOptions();
-    await updateTable();
   }
 
   init();
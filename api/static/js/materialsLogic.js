@@ -67,30 +67,9 @@ document.addEventListener('DOMContentLoaded', () => {
   }
   window.closeModal = closeAllModals;
 
-  async function fetchApplications() {
-    try {
-      const response = await fetch('/api/materials/', {
-        credentials: 'include'
-      });
-      if (!response.ok) throw new Error();
-      return await response.json();
-    } catch (error) {
-      console.error('Ошибка загрузки материалов:', error);
-      modals.error.classList.remove('hidden');
-      return [];
-    }
-  }
-
+  // Таблица заполняется постранично в materialsList.js
   async function updateTable() {
-    const applications = await fetchApplications();
-    table.body.innerHTML = applications.map(app => `
-      <tr>
-          <td>${app.id}</td>
-          <td>${app.name}</td>
-          <td>${app.amount}</td>
-          <td>${app.object}</td>
-      </tr>
-    `).join('');
+    await window.reloadMaterialsList();
   }
 
   async function populateSelectOptions() {
@@ -271,7 +250,6 @@ document.addEventListener('DOMContentLoaded', () => {
   // Инициализация
   async function init() {
     await populateSelectOptions();
-    await updateTable();
   }
 
   init();
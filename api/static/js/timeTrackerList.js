@@ -23,10 +23,10 @@ async function fetchApplications() {
 
         row.innerHTML = `
           <td>${app.id}</td>
-          <td>${app.employee.personnelNumber}</td>
+          <td>${app.personnelNumber}</td>
           <td>${app.date}</td>
           <td>${app.startTime.slice(0,8)}</td>
-          <td>${app.endTime.slice(0,8)}</td>
+          <td>${app.endTime ? app.endTime.slice(0,8) : ''}</td>
         `;
 
         tableBody.appendChild(row);
@@ -72,10 +72,10 @@ document.addEventListener('DOMContentLoaded', () => {
     table.body.innerHTML = applications.map(app => `
       <tr>
          <td>${app.id}</td>
-          <td>${app.employee.personnelNumber}</td>
+          <td>${app.personnelNumber}</td>
           <td>${app.date}</td>
           <td>${app.startTime.slice(0,8)}</td>
-          <td>${app.endTime.slice(0,8)}</td>
+          <td>${app.endTime ? app.endTime.slice(0,8) : ''}</td>
       </tr>
     `).join('');
   }
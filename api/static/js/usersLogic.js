@@ -66,30 +66,9 @@ document.addEventListener('DOMContentLoaded', () => {
   }
   window.closeModal = closeAllModals;
 
-  async function fetchApplications() {
-    try {
-      const response = await fetch('/api/users/', {
-        credentials: 'include'
-      });
-      if (!response.ok) throw new Error();
-      return await response.json();
-    } catch (error) {
-      console.error('Ошибка загрузки пользователей:', error);
-      modals.error.classList.remove('hidden');
-      return [];
-    }
-  }
-
+  // Таблица заполняется постранично в usersList.js
   async function updateTable() {
-    const applications = await fetchApplications();
-    table.body.innerHTML = applications.map(app => `
-      <tr>
-          <td>${app.id}</td>
-          <td>${app.login}</td>
-          <td>${'*'.repeat(8)}</td>
-          <td>${app.role}</td>
-      </tr>
-    `).join('');
+    await window.reloadUsersList();
   }
 
   async function populateSelectOptions() {
@@ -270,7 +249,6 @@ document.addEventListener('DOMContentLoaded', () => {
   // Инициализация
   async function init() {
     await populateSelectOptions();
-    await updateTable();
   }
 
   init();
@@ -0,0 +1,146 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .cache import get_version_info, bump_version
+from .models import Material, MaterialMovement
+from .routing import fresh_reads
+
+# Версия данных об остатках (сбрасывается сигналами и каждым движением)
+MATERIAL_VERSION = 'materials'
+
+SUMMARY_GROUPS = {
+    'object': {'objectName': F('object__name')},
+    'name': {},
+}
+
+
+class StockError(Exception):
+    pass
+
+
+# Остатки меняются UPDATE ... F(), в обход сигналов
+def invalidate_materials():
+    transaction.on_commit(lambda: bump_version(MATERIAL_VERSION))
+
+
+# Наибольший остаток, который помещается в Material.amount (99999999.99)
+_amount_field = Material._meta.get_field('amount')
+MAX_AMOUNT = Decimal(10) ** (_amount_field.max_digits - _amount_field.decimal_places) - Decimal(10) ** -_amount_field.decimal_places
+
+
+# Остаток меняется одним UPDATE ... SET amount = amount ± x, поэтому
+# параллельные кладовщики не затирают изменения друг друга.
+# Приход только если остаток не превысит MAX_AMOUNT — проверка в том же запросе
+def _receive(obj, name, amount):
+    material, _ = Material.objects.get_or_create(object=obj, name=name, defaults={'amount': 0})
+    updated = (
+        Material.objects
+        .filter(id=material.id, amount__lte=MAX_AMOUNT - amount)
+        .update(amount=F('amount') + amount)
+    )
+    if not updated:
+        raise StockError(f'Остаток материала "{name}" на объекте "{obj.name}" превысит {MAX_AMOUNT}')
+    return material
+
+# Списание только при достаточном остатке — проверка и изменение в одном запросе
+def _issue(obj, name, amount):
+    updated = (
+        Material.objects
+        .filter(object=obj, name=name, amount__gte=amount)
+        .update(amount=F('amount') - amount)
+    )
+    if not updated:
+        raise StockError(f'Недостаточно материала "{name}" на объекте "{obj.name}"')
+
+
+# Записывает движение в журнал и меняет остатки в одной транзакции
+@transaction.atomic
+def record_movement(kind, name, amount, source=None, target=None, user=None, comment=''):
+    amount = Decimal(amount)
+
+    if kind in (MaterialMovement.KIND_ISSUE, MaterialMovement.KIND_TRANSFER):
+        _issue(source, name, amount)
+    if kind in (MaterialMovement.KIND_RECEIPT, MaterialMovement.KIND_TRANSFER):
+        _receive(target, name, amount)
+    if kind == MaterialMovement.KIND_ADJUSTMENT:
+        if amount < 0:
+            _issue(target, name, -amount)
+        else:
+            _receive(target, name, amount)
+
+    invalidate_materials()
+    return MaterialMovement.objects.create(
+        kind=kind, name=name, amount=amount,
+        source=source, target=target, user=user, comment=comment,
+    )
+
+# Установка остатка вручную (инвентаризация): корректировка на разницу
+@transaction.atomic
+def set_balance(material, amount, user=None, comment='Инвентаризация'):
+    current = Material.objects.select_for_update().get(id=material.id).amount
+    delta = Decimal(amount) - current
+    if delta:
+        record_movement(
+            MaterialMovement.KIND_ADJUSTMENT, material.name, delta,
+            target=material.object, user=user, comment=comment,
+        )
+
+
+# Смена объекта или названия без движения возможна только при нулевом остатке,
+# иначе журнал разойдётся с остатками (остаток переносят движениями)
+@transaction.atomic
+def relabel_material(material, **changes):
+    if Material.objects.select_for_update().get(id=material.id).amount:
+        raise StockError('Объект и название меняются только при нулевом остатке, остаток переносится движениями')
+    for field, value in changes.items():
+        setattr(material, field, value)
+    material.save(update_fields=list(changes))
+
+
+# Сводка остатков: сумма по материалу (и объекту), группировка и порог — в БД.
+# below — вернуть только то, чего меньше порога
+def material_summary(params, group_by=('object', 'name'), below=None):
+    queryset = Material.objects.all()
+    if params.get('object'):
+        queryset = queryset.filter(object__name=params['object'])
+    if params.get('name'):
+        queryset = queryset.filter(name=params['name'])
+
+    group_fields = {}
+    for group in group_by:
+        group_fields.update(SUMMARY_GROUPS[group])
+    names = ['name'] if 'name' in group_by else []
+
+    # По объекту и названию строка одна (уникальный индекс), порог — обычный WHERE
+    if below is not None and len(group_by) == len(SUMMARY_GROUPS):
+        queryset = queryset.filter(amount__lt=below)
+        below = None
+
+    rows = queryset.values(*names, **group_fields).annotate(total=Sum('amount'))
+    if 'object' not in group_by:
+        rows = rows.annotate(objectCount=Count('object', distinct=True))
+    rows = rows.order_by(*group_fields, *names)
+    if below is not None:
+        rows = rows.filter(total__lt=below)
+
+    result = []
+    for row in rows:
+        row['total'] = str(Decimal(row['total']).quantize(Decimal('0.01')))
+        result.append(row)
+    return result
+
+# Сводка с кешированием до следующего изменения остатков
+def cached_material_summary(params, group_by=('object', 'name'), below=None):
+    version, modified = get_version_info(MATERIAL_VERSION)
+    key_params = ':'.join(f'{name}={params[name]}' for name in sorted(params))
+    key = f'materials:summary:{version}:{",".join(group_by)}:{below}:{key_params}'
+    result = cache.get(key)
+    if result is None:
+        with fresh_reads(modified):
+            result = material_summary(params, group_by, below)
+        cache.set(key, result, settings.REPORT_CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def stream_requested(request):
+    return request.query_params.get('stream') in ('1', 'true')
+
+# JSON-массив, который пишется по мере обхода элементов
+class StreamingJSONResponse(StreamingHttpResponse):
+    buffer_size = 64 * 1024
+
+    def __init__(self, items, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        # Асинхронный итератор (async-представления под ASGI) пишется без потоков
+        if hasattr(items, '__aiter__'):
+            content = self._aencode(items)
+        else:
+            content = self._encode(items)
+        super().__init__(content, **kwargs)
+
+    def _encode(self, items):
+        encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        buffer = '['
+        separator = ''
+        for item in items:
+            buffer += separator + encoder.encode(item)
+            separator = ','
+            if len(buffer) >= self.buffer_size:
+                yield buffer
+                buffer = ''
+        yield buffer + ']'
+
+    async def _aencode(self, items):
+        encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        buffer = '['
+        separator = ''
+        async for item in items:
+            buffer += separator + encoder.encode(item)
+            separator = ','
+            if len(buffer) >= self.buffer_size:
+                yield buffer
+                buffer = ''
+        yield buffer + ']'
+
+def iterate_queryset(queryset):
+    return queryset.iterator(chunk_size=settings.STREAM_CHUNK_SIZE)
+
+def aiterate_queryset(queryset):
+    return queryset.aiterator(chunk_size=settings.STREAM_CHUNK_SIZE)
+
+
+# Потоковый режим list (?stream=1): queryset обходится через iterator(),
+# ответ отдаётся частями, без построения всего списка в памяти
+class StreamingListMixin:
+    def list(self, request, *args, **kwargs):
+        if not stream_requested(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        return StreamingJSONResponse(
+            serializer_class(obj, context=context).data
+            for obj in iterate_queryset(queryset)
+        )
@@ -1,3 +1,1055 @@
-from django.test import TestCase
+import logging
+import os
+import tempfile
+import threading
+import time as clock
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import viewsets
+from rest_framework.views import APIView
+
+from . import lookups, ratelimit
+from .cache import get_version
+from .conditional import table_version_name
+from .exports import run_pending_exports
+from .intake import flush_intake
+from .instrumentation import query_budget
+from .management.commands.init import DEFAULT_ROLES
+from .models import (
+    ApplicationDailyStat, ClientsApplication, ClientsApplicationStatus, ClientsApplicationType, CustomUser, Employee,
+    ExportJob, JobTitle, Material, MaterialMovement, Object, Role, WorkTimeTracking,
+)
+from .permissions import PermissionRegistry, registry
+from .principal import PRINCIPAL_VERSION
+from .rollups import rebuild_application_stats
+from .routing import _read_alias, fresh_reads
+from .search import FTS_TABLE, fts_available, search_applications
+from .stock import MAX_AMOUNT, record_movement
+from .sessions import SESSION_ID_KEY
+from .views import EmployeeViewSet, ListWorkTimeTrackingAPIView
+
+
+### ОБЩЕЕ ###
+
+# Строка лога на каждый запрос в выводе тестов не нужна
+logging.getLogger('api.instrumentation').setLevel(logging.WARNING)
+
+# Быстрый хешер — пароли в тестах не проверяются на стойкость
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ApiTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.roles = {role['name']: Role.objects.create(**role) for role in DEFAULT_ROLES}
+
+    def setUp(self):
+        # Версии, пользователи сессий и справочники живут в кеше между тестами
+        cache.clear()
+
+    def create_user(self, role, login=None):
+        return CustomUser.objects.create(
+            login=login or f'{role}-{uuid.uuid4().hex[:8]}',
+            role=self.roles[role],
+            _password='password',
+        )
+
+    def create_employee(self, personnel_number='1', **kwargs):
+        fields = dict(
+            fullName=f'Сотрудник {personnel_number}', personnelNumber=personnel_number,
+            phoneNumber='', email='', bankDetails='', passport='',
+        )
+        fields.update(kwargs)
+        return Employee.objects.create(**fields)
+
+    # Вход без LoginAPIView: в сессию записывается то же, что при входе
+    def login_as(self, role, client=None):
+        client = client or self.client
+        user = self.create_user(role)
+        session = client.session
+        session['user_id'] = user.id
+        session[SESSION_ID_KEY] = uuid.uuid4().hex
+        session.save()
+        return user
+
+    # Не больше SQL-запросов, чем query_budget представления для действия
+    # (в работе превышение только пишется в лог, см. api/instrumentation.py)
+    @contextmanager
+    def assertQueryBudget(self, view_class, action):
+        budget = query_budget(view_class, action)
+        self.assertIsNotNone(budget, f'У {view_class.__name__} нет бюджета для {action}')
+        with CaptureQueriesContext(connection) as queries:
+            yield
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{view_class.__name__}.{action}: {len(queries)} запросов при бюджете {budget}\n'
+            + '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
+
+
+### ПРАВА ДОСТУПА ###
+
+class PermissionRegistryTests(TestCase):
+    def build(self, *view_classes):
+        permissions = PermissionRegistry()
+        permissions.build(view_classes, ['admin', 'hr'])
+        return permissions
+
+    def test_api_view_actions_are_http_methods(self):
+        class ReportView(APIView):
+            allowed_roles = ['hr']
+
+            def get(self, request):
+                pass
+
+            def post(self, request):
+                pass
+
+        permissions = self.build(ReportView)
+        self.assertCountEqual(permissions.views['ReportView'], ['get', 'post', 'options'])
+        self.assertTrue(permissions.is_allowed('hr', 'ReportView', 'get'))
+        self.assertFalse(permissions.is_allowed('admin', 'ReportView', 'get'))
+
+    def test_viewset_actions_and_action_roles(self):
+        class ItemViewSet(viewsets.ModelViewSet):
+            allowed_roles = ['admin', 'hr']
+            action_roles = {'destroy': ['admin']}
+
+        permissions = self.build(ItemViewSet)
+        self.assertIn('partial_update', permissions.views['ItemViewSet'])
+        self.assertTrue(permissions.is_allowed('hr', 'ItemViewSet', 'list'))
+        self.assertTrue(permissions.is_allowed('admin', 'ItemViewSet', 'destroy'))
+        self.assertFalse(permissions.is_allowed('hr', 'ItemViewSet', 'destroy'))
+
+    def test_matrix_for_unknown_role_denies_everything(self):
+        class ReportView(APIView):
+            allowed_roles = ['hr']
+
+            def get(self, request):
+                pass
+
+        matrix = self.build(ReportView).matrix_for('nobody')
+        self.assertEqual(matrix, {'ReportView': {'get': False, 'options': False}})
+
+    def test_project_registry_is_built_from_views(self):
+        self.assertTrue(registry.is_allowed('admin', 'UserViewSet', 'list'))
+        self.assertFalse(registry.is_allowed('hr', 'UserViewSet', 'list'))
+        self.assertTrue(registry.is_allowed('basic', 'ListWorkTimeTrackingAPIView', 'get'))
+
+
+class RolePermissionTests(ApiTestCase):
+    def test_permission_matrix_for_current_role(self):
+        self.login_as('hr')
+        response = self.client.get('/api/permissions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['role'], 'hr')
+        self.assertTrue(response.data['permissions']['EmployeeViewSet']['list'])
+        self.assertFalse(response.data['permissions']['UserViewSet']['list'])
+
+    def test_permission_matrix_requires_login(self):
+        self.assertEqual(self.client.get('/api/permissions/').status_code, 403)
+
+    def test_role_outside_matrix_is_forbidden(self):
+        self.login_as('basic')
+        self.assertEqual(self.client.get('/api/users/').status_code, 403)
+
+    def test_head_is_checked_as_get(self):
+        self.login_as('basic')
+        self.assertEqual(self.client.head('/api/wtt/listWTT/').status_code, 200)
+        self.assertEqual(self.client.head('/api/users/').status_code, 403)
+
+
+### СПРАВОЧНИКИ ###
+
+class ReferenceVersionTests(ApiTestCase):
+    def test_reference_version_changes_after_commit(self):
+        name = table_version_name(JobTitle)
+        before = get_version(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            job_title = JobTitle.objects.create(name='Монтажник')
+            job_title.delete()
+            self.assertEqual(get_version(name), before)
+        self.assertNotEqual(get_version(name), before)
+
+    def test_lookup_sees_committed_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            JobTitle.objects.create(name='Монтажник')
+        self.assertTrue(lookups.job_titles.exists('Монтажник'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            JobTitle.objects.filter(name='Монтажник').delete()
+            self.assertTrue(lookups.job_titles.exists('Монтажник'))
+        self.assertFalse(lookups.job_titles.exists('Монтажник'))
+
+    # Сброс версии потерян (другой процесс, без общего кеша) — справочник
+    # всё равно перечитывается по истечении LOOKUP_MAX_AGE
+    def test_lookup_expires_without_version_bump(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            JobTitle.objects.create(name='Монтажник')
+        self.assertTrue(lookups.job_titles.exists('Монтажник'))
+
+        JobTitle.objects.filter(name='Монтажник').delete()
+        self.assertTrue(lookups.job_titles.exists('Монтажник'))
+        with override_settings(LOOKUP_MAX_AGE=0):
+            self.assertFalse(lookups.job_titles.exists('Монтажник'))
+
+    def test_principal_version_changes_after_commit(self):
+        before = get_version(PRINCIPAL_VERSION)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_user('basic')
+            self.assertEqual(get_version(PRINCIPAL_VERSION), before)
+        self.assertNotEqual(get_version(PRINCIPAL_VERSION), before)
+
+
+### ИМПОРТ СОТРУДНИКОВ ###
+
+class ImportEmployeesTests(ApiTestCase):
+    HEADER = 'fullName;personnelNumber;phoneNumber;email;bankDetails;passport;jobTitle;object;user'
+
+    def setUp(self):
+        super().setUp()
+        self.login_as('hr')
+        JobTitle.objects.create(name='Монтажник')
+        Object.objects.create(name='Объект1', address='')
+        self.create_employee('100')
+
+    def row(self, number, job_title='Монтажник', obj='Объект1'):
+        return f'Сотрудник {number};{number};+79990000000;a{number}@mail.ru;счёт;паспорт;{job_title};{obj};'
+
+    def upload(self, lines, encoding='utf-8'):
+        content = '\n'.join([self.HEADER, *lines]).encode(encoding)
+        return self.client.post('/api/employees/import/', {'file': SimpleUploadedFile('employees.csv', content)})
+
+    def test_creates_all_rows(self):
+        response = self.upload([self.row('1'), self.row('2')])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(Employee.objects.get(personnelNumber='2').jobTitle.name, 'Монтажник')
+
+    # Любая ошибка отменяет весь файл, ошибки всех строк возвращаются разом
+    def test_errors_reject_whole_file(self):
+        response = self.upload([
+            self.row('1'),
+            self.row('1'),
+            self.row('100'),
+            self.row('3', job_title='Сварщик', obj='Объект9'),
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(set(errors), {3, 4, 5})
+        self.assertIn('повторяется', errors[3]['personnelNumber'])
+        self.assertIn('уже существует', errors[4]['personnelNumber'])
+        self.assertEqual(set(errors[5]), {'jobTitle', 'object'})
+        self.assertEqual(list(Employee.objects.values_list('personnelNumber', flat=True)), ['100'])
+
+    # CSV из Excel в cp1251 — 400 с подсказкой о кодировке, а не 500
+    def test_non_utf8_file(self):
+        response = self.upload([self.row('1')], encoding='cp1251')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('UTF-8', response.data['error'])
+        self.assertFalse(Employee.objects.filter(personnelNumber='1').exists())
+
+    def test_command_non_utf8_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'employees.csv'
+            path.write_bytes('\n'.join([self.HEADER, self.row('1')]).encode('cp1251'))
+            with self.assertRaisesMessage(CommandError, 'UTF-8'):
+                call_command('import_employees', str(path))
+
+
+### МАТЕРИАЛЫ ###
+
+class MaterialUpdateTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('storekeeper')
+        self.first = Object.objects.create(name='Объект1', address='')
+        self.second = Object.objects.create(name='Объект2', address='')
+        record_movement(MaterialMovement.KIND_RECEIPT, 'Цемент', 15, target=self.first)
+        self.material = Material.objects.get(object=self.first, name='Цемент')
+
+    def patch(self, data):
+        return self.client.patch(f'/api/materials/{self.material.id}/', data, content_type='application/json')
+
+    def test_relabel_with_balance_is_rejected(self):
+        response = self.patch({'object': 'Объект2', 'name': 'Песок'})
+        self.assertEqual(response.status_code, 400)
+        self.material.refresh_from_db()
+        self.assertEqual((self.material.object_id, self.material.name, self.material.amount), (self.first.id, 'Цемент', 15))
+
+    def test_relabel_after_zeroing_goes_through_ledger(self):
+        response = self.patch({'name': 'Песок', 'amount': '0'})
+        self.assertEqual(response.status_code, 200)
+        self.material.refresh_from_db()
+        self.assertEqual((self.material.name, self.material.amount), ('Песок', 0))
+        adjustment = MaterialMovement.objects.get(kind=MaterialMovement.KIND_ADJUSTMENT)
+        self.assertEqual((adjustment.name, adjustment.amount), ('Цемент', -15))
+
+    def test_amount_change_is_adjustment(self):
+        response = self.patch({'amount': '20'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(MaterialMovement.objects.get(kind=MaterialMovement.KIND_ADJUSTMENT).amount, 5)
+
+    # Остаток сверх max_digits не записывается: иначе список материалов перестаёт читаться
+    def test_receipt_overflow_is_rejected(self):
+        response = self.client.post(
+            '/api/materials/', {'name': 'Цемент', 'object': 'Объект1', 'amount': str(MAX_AMOUNT - 15)},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.post(
+            '/api/materials/', {'name': 'Цемент', 'object': 'Объект1', 'amount': '0.01'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            '/api/material-movements/', {'kind': 'receipt', 'name': 'Цемент', 'target': 'Объект1', 'amount': '1'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.amount, MAX_AMOUNT)
+        self.assertEqual(MaterialMovement.objects.count(), 2)
+        self.assertEqual(self.client.get('/api/materials/').status_code, 200)
+
+
+class MaterialSummaryCacheTests(ApiTestCase):
+    def test_object_rename_resets_summary(self):
+        self.login_as('storekeeper')
+        with self.captureOnCommitCallbacks(execute=True):
+            obj = Object.objects.create(name='O1', address='')
+            record_movement(MaterialMovement.KIND_RECEIPT, 'Цемент', 10, target=obj)
+        response = self.client.get('/api/materials/summary/')
+        self.assertEqual(response.data[0]['objectName'], 'O1')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            obj.name = 'O2'
+            obj.save()
+        response = self.client.get('/api/materials/summary/')
+        self.assertEqual(response.data[0]['objectName'], 'O2')
+        response = self.client.get('/api/materials/summary/?object=O2')
+        self.assertEqual(len(response.data), 1)
+
+
+class MaterialMovementFilterTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('storekeeper')
+        obj = Object.objects.create(name='Объект1', address='')
+        for day in (1, 2, 3):
+            movement = record_movement(MaterialMovement.KIND_RECEIPT, f'Материал {day}', 1, target=obj)
+            # Конец суток по местному времени — граница периода
+            MaterialMovement.objects.filter(id=movement.id).update(
+                date=timezone.make_aware(datetime(2026, 1, day, 23, 59, 59)),
+            )
+
+    # Период включает dateTo целиком, столбец date не оборачивается в функцию (индекс (date, id))
+    def test_date_range_uses_datetime_bounds(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/material-movements/?dateFrom=2026-01-02&dateTo=2026-01-02')
+        self.assertEqual([row['name'] for row in response.data], ['Материал 2'])
+        self.assertFalse(any('cast_date' in query['sql'] for query in queries.captured_queries))
+
+        response = self.client.get('/api/material-movements/?dateFrom=2026-01-02')
+        self.assertEqual([row['name'] for row in response.data], ['Материал 3', 'Материал 2'])
+
+
+### УЧЁТ ВРЕМЕНИ ###
+
+class WorkTimeListQueryTests(ApiTestCase):
+    def create_rows(self, size):
+        job_title = JobTitle.objects.create(name='Монтажник')
+        obj = Object.objects.create(name='Объект', address='Адрес')
+        employees = Employee.objects.bulk_create([
+            Employee(
+                fullName=f'Сотрудник {i}', personnelNumber=f'{size}-{i}',
+                phoneNumber='', email='', bankDetails='', passport='',
+                jobTitle=job_title, object=obj,
+            )
+            for i in range(size)
+        ])
+        WorkTimeTracking.objects.bulk_create([
+            WorkTimeTracking(employee=employee, date=date(2026, 1, 1) - timedelta(days=i),
+                             startTime=time(9), endTime=time(18))
+            for i, employee in enumerate(employees)
+        ])
+
+    # Сессия и сам список — число запросов не зависит от числа строк
+    def test_list_query_count_does_not_grow_with_rows(self):
+        self.login_as('admin')
+        self.client.get('/api/wtt/listWTT/')  # пользователь сессии попадает в кеш
+
+        for size in (5, 50):
+            WorkTimeTracking.objects.all().delete()
+            self.create_rows(size)
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/wtt/listWTT/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), size)
+            self.assertEqual(response.data[0]['jobTitle'], 'Монтажник')
+
+
+class StartWorkTests(ApiTestCase):
+    def test_second_start_is_rejected(self):
+        self.login_as('basic')
+        employee = self.create_employee()
+
+        first = self.client.post('/api/wtt/start/', {'personnelNumber': '1'}, content_type='application/json')
+        second = self.client.post('/api/wtt/start/', {'personnelNumber': '1'}, content_type='application/json')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(WorkTimeTracking.objects.filter(employee=employee, date=date.today()).count(), 1)
+
+
+class CrewStartWorkTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('foreman')
+        self.first = self.create_employee('1')
+        self.second = self.create_employee('2')
+
+    def start(self):
+        response = self.client.post(
+            '/api/wtt/crew/start/', {'personnelNumbers': ['1', '2', '3']}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return {row['personnelNumber']: row['result'] for row in response.data['results']}
+
+    def test_results(self):
+        WorkTimeTracking.objects.create(employee=self.second, date=date.today(), startTime=time(8))
+        self.assertEqual(self.start(), {'1': 'started', '2': 'already_started', '3': 'not_found'})
+
+    # Параллельный запрос вставил строку между проверкой и bulk_create
+    def test_concurrent_start_is_reported(self):
+        bulk_create = WorkTimeTracking.objects.bulk_create
+
+        def racing_bulk_create(rows, **kwargs):
+            WorkTimeTracking.objects.create(employee=self.second, date=date.today(), startTime=time(8))
+            return bulk_create(rows, **kwargs)
+
+        with mock.patch.object(WorkTimeTracking.objects, 'bulk_create', racing_bulk_create):
+            results = self.start()
+        self.assertEqual(results, {'1': 'started', '2': 'already_started', '3': 'not_found'})
+        self.assertEqual(WorkTimeTracking.objects.get(employee=self.second).startTime, time(8))
+
+
+# Миграция 0004: дубликаты (сотрудник, дата) сливаются до добавления ограничения
+class MergeDuplicateWorkDaysMigrationTests(TransactionTestCase):
+    migrate_from = [('api', '0003_exportjob')]
+    migrate_to = [('api', '0004_worktimetracking_unique_employee_date')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.apps = self.migrate(self.migrate_from)
+        self.addCleanup(lambda: self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes()))
+
+    def test_duplicates_are_merged(self):
+        Employee = self.apps.get_model('api', 'Employee')
+        WorkTimeTracking = self.apps.get_model('api', 'WorkTimeTracking')
+        employee = Employee.objects.create(
+            fullName='Сотрудник', personnelNumber='1',
+            phoneNumber='', email='', bankDetails='', passport='',
+        )
+        day = date(2026, 1, 1)
+        first = WorkTimeTracking.objects.create(employee=employee, date=day, startTime=time(9))
+        WorkTimeTracking.objects.create(employee=employee, date=day, startTime=time(10), endTime=time(17))
+        WorkTimeTracking.objects.create(employee=employee, date=day, startTime=time(11), endTime=time(18))
+        WorkTimeTracking.objects.create(employee=employee, date=day + timedelta(days=1), startTime=time(9))
+
+        WorkTimeTracking = self.migrate(self.migrate_to).get_model('api', 'WorkTimeTracking')
+        rows = list(WorkTimeTracking.objects.filter(date=day).values('id', 'startTime', 'endTime'))
+        self.assertEqual(rows, [{'id': first.id, 'startTime': time(9), 'endTime': time(18)}])
+        self.assertEqual(WorkTimeTracking.objects.count(), 2)
+
+
+class SyncClockEventsTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('foreman')
+        self.employee = self.create_employee()
+
+    def sync(self, *events):
+        items = [
+            {'clientEventId': event_id, 'personnelNumber': '1', 'kind': kind, 'timestamp': f'2026-10-10T{moment}:00Z'}
+            for event_id, kind, moment in events
+        ]
+        response = self.client.post('/api/wtt/sync/', items, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_stop_before_start_is_pending_and_applied_later(self):
+        result = self.sync(('stop-1', 'stop', '18:00'))
+        self.assertEqual(result['accepted'], 0)
+        self.assertEqual(result['pending'], [{'index': 0, 'clientEventId': 'stop-1'}])
+        self.assertFalse(WorkTimeTracking.objects.exists())
+
+        result = self.sync(('start-1', 'start', '09:00'))
+        self.assertEqual(result['accepted'], 1)
+        self.assertEqual(result['pending'], [])
+        row = WorkTimeTracking.objects.get(employee=self.employee, date=date(2026, 10, 10))
+        self.assertEqual((row.startTime, row.endTime), (time(9), time(18)))
+
+        result = self.sync(('stop-1', 'stop', '18:00'))
+        self.assertEqual(result['duplicates'], 1)
+
+    def test_start_and_stop_in_one_batch(self):
+        result = self.sync(('stop-1', 'stop', '17:00'), ('start-1', 'start', '08:00'), ('start-2', 'start', '09:00'))
+        self.assertEqual((result['accepted'], result['pending']), (3, []))
+        row = WorkTimeTracking.objects.get(employee=self.employee)
+        self.assertEqual((row.startTime, row.endTime), (time(8), time(17)))
+
+
+class WorkTimeReportCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('hr')
+        self.employee = self.create_employee()
+        self.past_day = date.today() - timedelta(days=10)
+        WorkTimeTracking.objects.create(employee=self.employee, date=self.past_day, startTime=time(9), endTime=time(18))
+        self.url = f'/api/wtt/report/?dateFrom={self.past_day - timedelta(days=30)}&dateTo={date.today() - timedelta(days=1)}'
+
+    def total_hours(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return sum(row['totalHours'] for row in response.data)
+
+    def test_closed_report_survives_clock_in_today(self):
+        self.assertEqual(self.total_hours(), 9)
+        # Изменение в обход сигналов — видно, отдаётся ли отчёт из кеша
+        WorkTimeTracking.objects.filter(date=self.past_day).update(endTime=time(19))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/wtt/start/', {'personnelNumber': '1'}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.total_hours(), 9)
+
+    def test_past_day_change_resets_closed_report(self):
+        self.assertEqual(self.total_hours(), 9)
+        with self.captureOnCommitCallbacks(execute=True):
+            WorkTimeTracking.objects.create(
+                employee=self.employee, date=self.past_day - timedelta(days=1),
+                startTime=time(9), endTime=time(17),
+            )
+        self.assertEqual(self.total_hours(), 17)
+
+    # В отчёте текущие ФИО и объект сотрудника, а не на момент отметки
+    def test_employee_and_object_changes_reset_closed_report(self):
+        obj = Object.objects.create(name='Объект1', address='')
+        self.url += '&groupBy=employee,object'
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.fullName = 'Петров'
+            self.employee.object = obj
+            self.employee.save()
+        row, = self.client.get(self.url).data
+        self.assertEqual((row['fullName'], row['object']), ('Петров', 'Объект1'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            obj.name = 'Объект2'
+            obj.save()
+        row, = self.client.get(self.url).data
+        self.assertEqual(row['object'], 'Объект2')
+
+
+### РЕПЛИКА ###
+
+@override_settings(REPLICA_MAX_LAG=5, REPLICA_LAG_CHECK_INTERVAL=1)
+class FreshReadsTests(TestCase):
+    def setUp(self):
+        token = _read_alias.set('replica')
+        self.addCleanup(_read_alias.reset, token)
+
+    def test_recent_version_reads_primary(self):
+        with fresh_reads(clock.time() - 2):
+            self.assertIsNone(_read_alias.get())
+        self.assertEqual(_read_alias.get(), 'replica')
+
+    def test_old_version_keeps_replica(self):
+        with fresh_reads(clock.time() - 60):
+            self.assertEqual(_read_alias.get(), 'replica')
+
+
+### ВЫГРУЗКИ ###
+
+class ExportJobTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        export_root = tempfile.TemporaryDirectory()
+        self.addCleanup(export_root.cleanup)
+        settings_override = override_settings(EXPORT_ROOT=Path(export_root.name))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def start_job(self):
+        response = self.client.get('/api/wtt/export/?background=1')
+        self.assertEqual(response.status_code, 202)
+        return response.data['id']
+
+    def test_worker_runs_pending_job(self):
+        self.login_as('hr')
+        job_id = self.start_job()
+        self.assertEqual(ExportJob.objects.get(id=job_id).status, ExportJob.STATUS_PENDING)
+
+        self.assertEqual(run_pending_exports(), 1)
+        self.assertEqual(self.client.get(f'/api/wtt/export/{job_id}/').data['status'], ExportJob.STATUS_DONE)
+        response = self.client.get(f'/api/wtt/export/{job_id}/download/')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_jobs_of_other_users_are_not_visible(self):
+        self.login_as('hr')
+        job_id = self.start_job()
+        run_pending_exports()
+
+        self.login_as('admin')
+        self.assertEqual(self.client.get(f'/api/wtt/export/{job_id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/wtt/export/{job_id}/download/').status_code, 404)
+
+    def test_missing_file_is_not_found(self):
+        self.login_as('hr')
+        job_id = self.start_job()
+        run_pending_exports()
+        os.remove(ExportJob.objects.get(id=job_id).file)
+        self.assertEqual(self.client.get(f'/api/wtt/export/{job_id}/download/').status_code, 404)
+
+    def test_stale_running_job_is_failed(self):
+        started = timezone.now() - timedelta(days=1)
+        job = ExportJob.objects.create(kind='timesheet', format='csv', status=ExportJob.STATUS_RUNNING, started=started)
+        run_pending_exports()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+
+
+### ASYNC ###
+
+# Основной хешер «с новыми параметрами»: пароли, захешированные MD5, перехешируются при входе
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    iterations = 1
+
+
+class AsyncLoginTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('basic', login='worker')
+
+    def login(self):
+        return self.async_client.post(
+            '/api/async/login/', {'login': 'worker', 'password': 'password'}, content_type='application/json',
+        )
+
+    async def test_busy_pool_returns_503(self):
+        with mock.patch('api.async_views._hash_slots', threading.BoundedSemaphore(1)) as slots:
+            slots.acquire()
+            response = await self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], str(settings.LOGIN_RETRY_AFTER))
+
+    # Проверка — в пуле, сохранение нового хеша — вне его потоков
+    async def test_rehash_is_saved_outside_hash_pool(self):
+        threads = []
+        save = CustomUser.save
+
+        def tracked_save(user, *args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return save(user, *args, **kwargs)
+
+        hashers = ['api.tests.FastPBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher']
+        with override_settings(PASSWORD_HASHERS=hashers), mock.patch.object(CustomUser, 'save', tracked_save):
+            response = await self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(threads), 1)
+        self.assertFalse(threads[0].startswith('login-hash'))
+        await self.user.arefresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1$'))
+
+
+class AsyncListTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('admin', client=self.async_client)
+        ClientsApplication.objects.bulk_create([
+            ClientsApplication(fullName=f'Клиент {i}', phoneNumber=f'+7 999 000-00-{i:02}', description='Звонок')
+            for i in range(5)
+        ])
+        ClientsApplication.objects.create(fullName='Иванов Пётр', phoneNumber='+7 999 111-22-33', description='Крыша')
+        obj = Object.objects.create(name='Объект1', address='')
+        record_movement(MaterialMovement.KIND_RECEIPT, 'Цемент', 10, target=obj)
+        record_movement(MaterialMovement.KIND_RECEIPT, 'Песок', 5, target=obj)
+
+    async def test_applications_search(self):
+        response = await self.async_client.get('/api/async/applications/?search=Иванов')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['fullName'], 'Иванов Пётр')
+
+    async def test_applications_page_size(self):
+        response = await self.async_client.get('/api/async/applications/?page_size=2')
+        data = response.json()
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next'])
+
+        response = await self.async_client.get(data['next'])
+        self.assertEqual(len(response.json()['results']), 2)
+
+    async def test_material_movements_filters_and_ordering(self):
+        response = await self.async_client.get('/api/async/material-movements/?name=Песок')
+        self.assertEqual([row['name'] for row in response.json()], ['Песок'])
+
+        response = await self.async_client.get('/api/async/material-movements/')
+        self.assertEqual([row['name'] for row in response.json()], ['Песок', 'Цемент'])
+
+        response = await self.async_client.get('/api/async/material-movements/?dateFrom=bad')
+        self.assertEqual(response.status_code, 400)
+
+
+### ПОИСК ЗАЯВОК ###
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5-индекс с триггерами — только в SQLite')
+class ApplicationSearchIndexTests(ApiTestCase):
+    # Триггеры пропадают при пересоздании таблицы (AlterField в SQLite):
+    # после всех миграций они должны быть на месте
+    def test_triggers_exist_after_migrations(self):
+        self.assertTrue(fts_available(), 'Нет таблицы FTS5 — SQLite без FTS5 или миграция 0006 пропущена')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'api_clientsapplication'"
+            )
+            triggers = {name for (name,) in cursor.fetchall()}
+        self.assertEqual(triggers, {f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'})
+
+    def search(self, text):
+        return list(search_applications(ClientsApplication.objects.all(), text).values_list('id', flat=True))
+
+    def test_index_follows_insert_update_delete(self):
+        application = ClientsApplication.objects.create(
+            fullName='Иванов Пётр', phoneNumber='+7 (999) 123-45-67', description='Протекает крыша',
+        )
+        self.assertEqual(self.search('Иванов'), [application.id])
+        self.assertEqual(self.search('9991234567'), [application.id])
+
+        application.fullName = 'Сидоров Пётр'
+        application.save()
+        self.assertEqual(self.search('Иванов'), [])
+        self.assertEqual(self.search('Сидоров'), [application.id])
+
+        application.delete()
+        self.assertEqual(self.search('Сидоров'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+### СВОДКА ЗАЯВОК ###
+
+# Сводка, обновляемая сигналами на разницу, совпадает с полным пересчётом
+class ApplicationStatsTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('marketer')
+        self.callback = ClientsApplicationType.objects.create(name='Обратный звонок')
+        self.measure = ClientsApplicationType.objects.create(name='Замер')
+        self.new = ClientsApplicationStatus.objects.create(name='Новая')
+        self.done = ClientsApplicationStatus.objects.create(name='Выполнена')
+
+    def create(self, date=None, type=None, status=None):
+        return ClientsApplication.objects.create(
+            fullName='Иванов', phoneNumber='+79990000000', description='Звонок',
+            type=type or self.callback, status=status or self.new, date=date or timezone.now(),
+        )
+
+    def stats(self):
+        counts = {}
+        for day, type_id, status_id, count in ApplicationDailyStat.objects.values_list('date', 'type_id', 'status_id', 'count'):
+            counts[day, type_id, status_id] = counts.get((day, type_id, status_id), 0) + count
+        return {key: count for key, count in counts.items() if count}
+
+    def assertStatsMatchRebuild(self):
+        incremental = self.stats()
+        rebuild_application_stats()
+        self.assertEqual(incremental, self.stats())
+
+    def test_create_update_delete(self):
+        first = self.create()
+        self.create(date=timezone.now() - timedelta(days=3), type=self.measure)
+        third = self.create()
+        self.assertStatsMatchRebuild()
+
+        response = self.client.put(f'/api/applications/{first.id}/', {
+            'fullName': 'Иванов', 'phoneNumber': '+79990000000', 'description': 'Звонок', 'status_name': 'Выполнена',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.data)
+        third.type = self.measure
+        third.date = timezone.now() - timedelta(days=1)
+        third.save()
+        self.assertStatsMatchRebuild()
+
+        self.assertEqual(self.client.delete(f'/api/applications/{first.id}/').status_code, 200)
+        third.delete()
+        self.assertStatsMatchRebuild()
+
+    # Тип и статус заявок обнуляются массовым UPDATE (SET NULL)
+    def test_type_and_status_delete(self):
+        self.create()
+        self.create(type=self.measure, status=self.done)
+        self.measure.delete()
+        self.assertStatsMatchRebuild()
+        self.new.delete()
+        self.assertStatsMatchRebuild()
+
+    # Заявка загружена без date/type/status — старый ключ читается из БД
+    def test_deferred_fields(self):
+        first = self.create()
+        second = self.create()
+
+        application = ClientsApplication.objects.only('fullName').get(id=first.id)
+        application.status = self.done
+        application.save()
+        self.assertStatsMatchRebuild()
+
+        application = ClientsApplication.objects.defer('status', 'date').get(id=second.id)
+        application.fullName = 'Петров'
+        application.save()
+        self.assertStatsMatchRebuild()
+
+        ClientsApplication.objects.only('id').get(id=second.id).delete()
+        self.assertStatsMatchRebuild()
+        self.assertEqual(sum(self.stats().values()), 1)
+
+
+### ПРИЁМ ЗАЯВОК ###
+
+@override_settings(APPLICATION_INTAKE_MODE='buffered')
+class BufferedIntakeTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.spool = Path(directory.name)
+        spool_settings = override_settings(INTAKE_SPOOL_DIR=directory.name)
+        spool_settings.enable()
+        self.addCleanup(spool_settings.disable)
+
+        self.callback = ClientsApplicationType.objects.create(name='Обратный звонок')
+        self.measure = ClientsApplicationType.objects.create(name='Замер')
+        self.new = ClientsApplicationStatus.objects.create(name='Новая')
+
+    def submit(self, phone='+7 999 000-00-01', description='Перезвоните', **data):
+        data = dict(fullName='Иванов', phoneNumber=phone, description=description, **data)
+        return self.client.post('/api/applications/', data, content_type='application/json')
+
+    def spooled(self, name):
+        return sorted(path.name for path in (self.spool / name).glob('*.json'))
+
+    def test_invalid_submission_is_not_queued(self):
+        for data in ({'description': ''}, {'type_name': 'Нет такого'}, {'phone': '1' * 100}):
+            self.assertEqual(self.submit(**data).status_code, 400)
+        self.assertEqual(self.spooled('incoming'), [])
+
+    # Повтор за окно дедупликации подтверждается, но в очередь не попадает
+    def test_duplicate_is_dropped(self):
+        self.assertEqual(self.submit().status_code, 202)
+        self.assertEqual(self.submit(phone='+7 (999) 000 00 01', description=' перезвоните ').status_code, 202)
+        self.assertEqual(len(self.spooled('incoming')), 1)
+
+    def test_flush_creates_applications_and_stats(self):
+        self.submit()
+        self.submit(phone='+7 999 000-00-02', type_name='Замер')
+        self.assertFalse(ClientsApplication.objects.exists())
+
+        self.assertEqual(flush_intake(), (2, 0))
+        self.assertEqual(
+            sorted(ClientsApplication.objects.values_list('type__name', 'status__name')),
+            [('Замер', 'Новая'), ('Обратный звонок', 'Новая')],
+        )
+        self.assertEqual(self.spooled('incoming') + self.spooled('processing'), [])
+        self.assertEqual(sorted(ApplicationDailyStat.objects.values_list('type_id', 'count')),
+                         [(self.callback.id, 1), (self.measure.id, 1)])
+
+    def test_bad_files_go_to_failed(self):
+        self.submit()
+        (self.spool / 'incoming' / '0-broken.json').write_text('{', encoding='utf-8')
+        (self.spool / 'incoming' / '0-incomplete.json').write_text('{"fullName": "Иванов"}', encoding='utf-8')
+
+        self.assertEqual(flush_intake(), (1, 2))
+        self.assertEqual(self.spooled('failed'), ['0-broken.json', '0-incomplete.json'])
+        self.assertEqual(ClientsApplication.objects.count(), 1)
+
+    # Тип удалён, а справочник процесса об этом ещё не знает (сброс не дошёл):
+    # заявка откладывается, остальная пачка переносится
+    def test_deleted_type_with_stale_lookup(self):
+        self.submit(type_name='Замер')
+        self.submit(phone='+7 999 000-00-02')
+        self.measure.delete()
+        self.assertTrue(lookups.application_types.exists('Замер'))
+
+        self.assertEqual(flush_intake(), (1, 1))
+        self.assertEqual(len(self.spooled('failed')), 1)
+        self.assertEqual(list(ClientsApplication.objects.values_list('type__name', flat=True)), ['Обратный звонок'])
+
+
+### ОГРАНИЧЕНИЕ ЧАСТОТЫ ###
+
+LOGIN_LIMIT = {'path': '/api/login/', 'methods': ['POST'], 'ip': (2, 60), 'total': (3, 60)}
+ASYNC_LOGIN_LIMIT = {'path': '/api/async/login/', 'methods': ['POST'], 'ip': (1, 60)}
+
+
+@override_settings(RATE_LIMITS={'login': LOGIN_LIMIT, 'async_login': ASYNC_LOGIN_LIMIT})
+class RateLimitTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        # Блокировки в памяти процесса переживают cache.clear()
+        ratelimit._blocked.clear()
+        self.addCleanup(ratelimit._blocked.clear)
+
+    def login(self, ip):
+        return self.client.post('/api/login/', {'login': 'nobody', 'password': 'x'}, REMOTE_ADDR=ip)
+
+    def test_ip_bucket(self):
+        self.assertEqual(self.login('10.0.0.1').status_code, 401)
+        self.assertEqual(self.login('10.0.0.1').status_code, 401)
+
+        # Отказ — до сессий и представления, без обращений к БД
+        with self.assertNumQueries(0):
+            response = self.login('10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(self.login('10.0.0.2').status_code, 401)
+
+    def test_total_bucket(self):
+        self.login('10.0.0.1')
+        self.login('10.0.0.1')
+        self.login('10.0.0.2')
+        self.assertEqual(self.login('10.0.0.3').status_code, 429)
+
+    def test_only_listed_methods_are_limited(self):
+        for _ in range(3):
+            self.login('10.0.0.1')
+        self.assertNotEqual(self.client.get('/api/login/', REMOTE_ADDR='10.0.0.1').status_code, 429)
+
+    # Уже заблокированный адрес отсекается в процессе, кеш не читается
+    def test_blocked_ip_skips_cache(self):
+        for _ in range(3):
+            self.login('10.0.0.1')
+        with mock.patch('api.ratelimit.cache', wraps=cache) as shared_cache:
+            self.assertEqual(self.login('10.0.0.1').status_code, 429)
+        shared_cache.get_many.assert_not_called()
+
+    async def test_async_login(self):
+        response = await self.async_client.post('/api/async/login/', {'login': 'nobody'}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.post('/api/async/login/', {'login': 'nobody'}, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+
+    def test_rejection_metric(self):
+        for _ in range(4):
+            self.login('10.0.0.1')
+        self.login_as('admin')
+        response = self.client.get('/api/metrics/rate-limit/')
+        self.assertEqual(response.data['rejected'], {'login': 2, 'async_login': 0})
+
+
+### ЗАМЕРЫ ###
+
+# Бюджеты query_budget при пустом кеше (сессия, пользователь, справочники)
+class QueryBudgetTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login_as('hr')
+        self.job_title = JobTitle.objects.create(name='Монтажник')
+        self.object = Object.objects.create(name='Объект', address='Адрес')
+        self.employee = self.create_employee(jobTitle=self.job_title, object=self.object)
+        self.user = self.create_user('basic', login='worker')
+
+    def test_employee_list(self):
+        self.create_employee('2', jobTitle=self.job_title, object=self.object, user=self.user)
+        with self.assertQueryBudget(EmployeeViewSet, 'list'):
+            response = self.client.get('/api/employees/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+    def test_employee_retrieve(self):
+        with self.assertQueryBudget(EmployeeViewSet, 'retrieve'):
+            response = self.client.get(f'/api/employees/{self.employee.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_employee_create_with_user(self):
+        data = {
+            'fullName': 'Новый', 'personnelNumber': '2', 'phoneNumber': '+7 999 000-00-00', 'email': 'a@b.ru',
+            'bankDetails': '-', 'passport': '-', 'jobTitle': 'Монтажник', 'object': 'Объект',
+            'user': 'worker',
+        }
+        with self.assertQueryBudget(EmployeeViewSet, 'create'):
+            response = self.client.post('/api/employees/', data, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Employee.objects.get(personnelNumber='2').user, self.user)
+
+    def test_employee_partial_update_with_user(self):
+        with self.assertQueryBudget(EmployeeViewSet, 'partial_update'):
+            response = self.client.patch(
+                f'/api/employees/{self.employee.id}/',
+                {'user': 'worker', 'object': 'Объект'}, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.user, self.user)
+
+    def test_employee_update_with_user(self):
+        data = {
+            'fullName': 'Сотрудник 1', 'personnelNumber': '1', 'phoneNumber': '+7 999 000-00-00', 'email': 'a@b.ru',
+            'bankDetails': '-', 'passport': '-', 'jobTitle': 'Монтажник', 'object': 'Объект',
+            'user': 'worker',
+        }
+        with self.assertQueryBudget(EmployeeViewSet, 'update'):
+            response = self.client.put(f'/api/employees/{self.employee.id}/', data, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_employee_destroy(self):
+        with self.assertQueryBudget(EmployeeViewSet, 'destroy'):
+            response = self.client.delete(f'/api/employees/{self.employee.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Employee.objects.exists())
+
+    def test_work_time_list(self):
+        WorkTimeTracking.objects.create(employee=self.employee, date=date(2026, 1, 1), startTime=time(9))
+        with self.assertQueryBudget(ListWorkTimeTrackingAPIView, 'get'):
+            response = self.client.get('/api/wtt/listWTT/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+
+class InstrumentationMiddlewareTests(ApiTestCase):
+    def test_server_timing_header(self):
+        self.login_as('hr')
+        response = self.client.get('/api/employees/')
+        timing = response['Server-Timing']
+        for metric in ('db;', 'serializer;', 'render;', 'total;'):
+            self.assertIn(metric, timing)
+
+    # Превышение бюджета в работе — предупреждение в логе, ответ не меняется
+    def test_budget_overrun_is_logged(self):
+        self.login_as('hr')
+        with mock.patch.object(EmployeeViewSet, 'query_budget', {'list': 0}):
+            with self.assertLogs('api.instrumentation', logging.WARNING) as logs:
+                response = self.client.get('/api/employees/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('EmployeeViewSet', logs.output[0])
@@ -12,23 +12,43 @@ from .views import (
     ClientsApplicationStatusViewSet,
     ClientsApplicationViewSet,
     MaterialViewSet,
+    MaterialMovementViewSet,
     RoleViewSet,
+    ApplicationDashboardAPIView,
 
     # Импорт логики WTT
     StartWorkAPIView,
     EndWorkAPIView,
+    CrewStartWorkAPIView,
+    CrewEndWorkAPIView,
+    SyncClockEventsAPIView,
     UpdateWorkTimeTrackingAPIView,
     DeleteWorkTimeTrackingAPIView,
     ListWorkTimeTrackingAPIView,
+    WorkTimeReportAPIView,
+
+    # Импорт выгрузок
+    TimesheetExportAPIView,
+    ExportJobAPIView,
+    ExportJobDownloadAPIView,
 
     # Импорт служебной логики
     LoginAPIView, 
     LogoutAPIView,
     CheckLoginAPIView,
+    PermissionMatrixAPIView,
+    RateLimitMetricsAPIView,
 
     RenderPageAPIView
 )
 
+from .async_views import (
+    AsyncLoginView,
+    AsyncCheckLoginView,
+    AsyncListView,
+    AsyncListWorkTimeTrackingView,
+)
+
 # Настройка роутера
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
@@ -39,8 +59,23 @@ router.register(r'application-types', ClientsApplicationTypeViewSet, basename='a
 router.register(r'application-statuses', ClientsApplicationStatusViewSet, basename='application-statuse')
 router.register(r'applications', ClientsApplicationViewSet, basename='application')
 router.register(r'materials', MaterialViewSet, basename='material')
+router.register(r'material-movements', MaterialMovementViewSet, basename='material-movement')
 router.register(r'roles', RoleViewSet, basename='role')
 
+# Async-варианты списков (под ASGI): /api/async/<префикс роутера>/
+ASYNC_LISTS = [
+    ('users', UserViewSet),
+    ('employees', EmployeeViewSet),
+    ('job-titles', JobTitleViewSet),
+    ('objects', ObjectViewSet),
+    ('application-types', ClientsApplicationTypeViewSet),
+    ('application-statuses', ClientsApplicationStatusViewSet),
+    ('applications', ClientsApplicationViewSet),
+    ('materials', MaterialViewSet),
+    ('material-movements', MaterialMovementViewSet),
+    ('roles', RoleViewSet),
+]
+
 # URL паттерны
 urlpatterns = [
     path('', lambda request: redirect('pages/index/', permanent=False)),
@@ -54,11 +89,31 @@ urlpatterns = [
     path('api/login/', LoginAPIView.as_view(), name='login'),
     path('api/logout/', LogoutAPIView.as_view(), name='logout'),
     path('api/check-login/', CheckLoginAPIView.as_view(), name='check-login'),
+    path('api/permissions/', PermissionMatrixAPIView.as_view(), name='permissions'),
+    path('api/metrics/rate-limit/', RateLimitMetricsAPIView.as_view(), name='rate-limit-metrics'),
+    path('api/async/login/', AsyncLoginView.as_view(), name='async-login'),
+    path('api/async/check-login/', AsyncCheckLoginView.as_view(), name='async-check-login'),
+    path('api/async/wtt/listWTT/', AsyncListWorkTimeTrackingView.as_view()),
+
+    # Панель
+    path('api/dashboard/applications/', ApplicationDashboardAPIView.as_view()),
     
     # WTT
     path('api/wtt/start/', StartWorkAPIView.as_view()),
     path('api/wtt/stop/', EndWorkAPIView.as_view()),
+    path('api/wtt/crew/start/', CrewStartWorkAPIView.as_view()),
+    path('api/wtt/crew/stop/', CrewEndWorkAPIView.as_view()),
+    path('api/wtt/sync/', SyncClockEventsAPIView.as_view()),
     path('api/wtt/updateWTT/', UpdateWorkTimeTrackingAPIView.as_view()),
     path('api/wtt/deleteWTT/', DeleteWorkTimeTrackingAPIView.as_view()),
     path('api/wtt/listWTT/', ListWorkTimeTrackingAPIView.as_view()),
-]
\ No newline at end of file
+    path('api/wtt/report/', WorkTimeReportAPIView.as_view()),
+    path('api/wtt/export/', TimesheetExportAPIView.as_view()),
+    path('api/wtt/export/<int:job_id>/', ExportJobAPIView.as_view()),
+    path('api/wtt/export/<int:job_id>/download/', ExportJobDownloadAPIView.as_view()),
+]
+
+urlpatterns += [
+    path(f'api/async/{prefix}/', AsyncListView.as_view(viewset=viewset))
+    for prefix, viewset in ASYNC_LISTS
+]
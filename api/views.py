@@ -1,16 +1,24 @@
 from django.shortcuts import render
 from django.http import JsonResponse
-from django.http import HttpResponseForbidden, HttpResponseNotFound
+from django.http import HttpResponseForbidden, HttpResponseNotFound, FileResponse
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework import status
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, mixins
 from rest_framework.permissions import BasePermission
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.decorators import action
 
+import io
 from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
 
 from .models import (
     CustomUser, 
@@ -18,12 +26,42 @@ from .models import (
     JobTitle,
     Object,
     Material,
+    MaterialMovement,
     ClientsApplicationType,
     ClientsApplicationStatus, 
     ClientsApplication, 
     WorkTimeTracking,
-    Role
+    Role,
+    ExportJob,
+)
+
+from . import lookups
+from .principal import get_principal
+from .sessions import start_session, end_session
+from .filters import parse_date_range, filter_datetime_range, filter_work_time_list, DATE_FORMAT_ERROR
+from .exports import (
+    EXPORT_FORMATS,
+    timesheet_header,
+    timesheet_queryset,
+    timesheet_rows,
+    csv_streaming_response,
+    start_export_job,
+    xlsx_available,
 )
+from .ingest import JSONLinesParser, ingest_clock_events
+from .imports import CSV_ENCODING, ImportFileError, import_employees
+from .stock import SUMMARY_GROUPS, StockError, cached_material_summary, record_movement, relabel_material, set_balance
+from .reports import REPORT_GROUPS, REPORT_PERIODS, cached_hours_report, invalidate_work_time
+from .search import search_applications
+from .intake import buffered_intake, validate_submission, is_duplicate, enqueue_submission
+from .rollups import DASHBOARD_PERIODS, application_dashboard
+from .pagination import SearchResultsPagination
+from .conditional import ConditionalGetMixin
+from .streaming import StreamingListMixin, StreamingJSONResponse, stream_requested, iterate_queryset
+from .permissions import RolePermission, registry
+from .db import retry_on_locked
+from .instrumentation import InstrumentedViewSetMixin
+from .ratelimit import rejection_counts
 
 from .serializers import (
     CustomUserSerializer,
@@ -31,13 +69,16 @@ from .serializers import (
     JobTitleSerializer,
     ObjectSerializer, 
     MaterialSerializer,
+    MaterialMovementSerializer,
     ClientsApplicationTypeSerializer, 
     ClientsApplicationStatusSerializer,
     ClientsApplicationSerializer, 
     StartWorkSerializer, 
     EndWorkSerializer,
+    CrewWorkSerializer,
     WorkTimeTrackingSerializer,
     RoleSerializer,
+    work_time_list_values,
 )
 
 ##### FRONTEND #####
@@ -148,14 +189,12 @@ class IsSessionAuthenticated(BasePermission):
     message = 'Not authenticated'
 
     def has_permission(self, request, view):
-        user_id = request.session.get('user_id')
-        if not user_id:
-            return False
-        try:
-            request.my_user = CustomUser.objects.get(id=user_id)
-            return True
-        except CustomUser.DoesNotExist:
+        # Пользователь и роль берутся из кеша (см. principal.py)
+        user = get_principal(request)
+        if user is None:
             return False
+        request.my_user = user
+        return True
 
 # Ответ о логине для фронта
 class CheckLoginAPIView(APIView):
@@ -166,8 +205,11 @@ class CheckLoginAPIView(APIView):
         return Response({'logged_in': True})
 
 
-# Проверка доступа по роли
+# Проверка доступа по роли (для страниц из PAGE_CONFIG).
+# Для API используется матрица доступа RolePermission
 def roleRequiredPermissionFactory(allowed_roles):
+    allowed_roles = frozenset(allowed_roles)
+
     class CustomRolePermission(BasePermission):
         def has_permission(self, request, view):
             user = request.my_user
@@ -176,6 +218,26 @@ def roleRequiredPermissionFactory(allowed_roles):
             return user.role.name in allowed_roles
     return CustomRolePermission
 
+# Матрица доступа для роли текущего пользователя (фронт скрывает недоступные элементы)
+class PermissionMatrixAPIView(APIView):
+    permission_classes = [IsSessionAuthenticated]
+
+    def get(self, request):
+        role = request.my_user.role
+        role_name = role.name if role else None
+        return Response({
+            'role': role_name,
+            'permissions': registry.matrix_for(role_name),
+        })
+
+# Число запросов, отклонённых ограничением частоты (по правилам RATE_LIMITS)
+class RateLimitMetricsAPIView(APIView):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin']
+
+    def get(self, request):
+        return Response({'rejected': rejection_counts()})
+
 # Вход в систему
 class LoginAPIView(APIView):
     def post(self, request):
@@ -185,8 +247,7 @@ class LoginAPIView(APIView):
         try:
             user = CustomUser.objects.get(login=login)
             if user.check_password(password):
-                request.session['user_id'] = user.id
-                request.session.modified = True  # Принудительно сохраняем сессию
+                start_session(request, user)
                 return JsonResponse({'status': 'Success'})
             return Response({'error': 'Wrong password'}, status=status.HTTP_401_UNAUTHORIZED)
         except CustomUser.DoesNotExist:
@@ -197,17 +258,18 @@ class LogoutAPIView(APIView):
     permission_classes = [IsSessionAuthenticated]
 
     def post(self, request):
-        if 'user_id' in request.session:
-            del request.session['user_id']
-            request.session.modified = True
+        end_session(request)
         return Response({'status': 'Logged out'}, status=status.HTTP_200_OK)
 
 
 ### ПОЛЬЗОВАТЕЛИ ###
-class UserViewSet(viewsets.ModelViewSet):
-    permission_classes = [IsSessionAuthenticated, roleRequiredPermissionFactory(['admin'])]
+class UserViewSet(InstrumentedViewSetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin']
+    # GET-запросы читают с реплики, если она настроена (см. routing.py)
+    read_preference = 'replica'
     
-    queryset = CustomUser.objects.all()
+    queryset = CustomUser.objects.select_related('role')
     serializer_class = CustomUserSerializer
 
     # Создание нового пользователя
@@ -237,7 +299,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
         if 'role' in validated_data:
             try:
-                role = Role.objects.get(name=validated_data.pop('role'))
+                role = lookups.roles.get(validated_data.pop('role'))
                 instance.role = role
             except Role.DoesNotExist:
                 return Response({'error': 'Роль с таким названием не существует'}, status=status.HTTP_400_BAD_REQUEST)
@@ -260,10 +322,16 @@ class UserViewSet(viewsets.ModelViewSet):
 
 ### СОТРУДНИКИ ###
 
-class EmployeeViewSet(viewsets.ModelViewSet):
-    permission_classes = [IsSessionAuthenticated, roleRequiredPermissionFactory(['admin', 'hr'])]
+class EmployeeViewSet(InstrumentedViewSetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'hr']
+    read_preference = 'replica'
+    # Сессия, пользователь и справочники при пустом кеше + сами запросы (api/instrumentation.py).
+    # Запись: проверки табельного номера и пользователя, в update они и сохранение повторяются.
+    # Проверяется тестами (QueryBudgetTests)
+    query_budget = {'list': 3, 'retrieve': 3, 'create': 9, 'update': 12, 'partial_update': 12, 'destroy': 6}
 
-    queryset = Employee.objects.all()
+    queryset = Employee.objects.select_related('jobTitle', 'object', 'user')
     serializer_class = EmployeeSerializer
 
     # Создание нового сотрудника
@@ -322,11 +390,29 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         except Employee.DoesNotExist:
             return Response({'error': 'Сотрудник не найден'}, status=status.HTTP_404_NOT_FOUND)
 
+    # Массовый импорт сотрудников из CSV (поле file)
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_csv(self, request):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({'error': 'Файл не передан'}, status=status.HTTP_400_BAD_REQUEST)
+
+        file = io.TextIOWrapper(upload.file, encoding=CSV_ENCODING, newline='')
+        try:
+            created, errors = import_employees(file)
+        except ImportFileError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': 'Сотрудники успешно импортированы', 'created': created}, status=status.HTTP_201_CREATED)
+
 
 ### ДОЛЖНОСТИ ###
 
-class JobTitleViewSet(viewsets.ModelViewSet):
-    permission_classes = [IsSessionAuthenticated, roleRequiredPermissionFactory(['admin', 'hr'])]
+class JobTitleViewSet(InstrumentedViewSetMixin, ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'hr']
+    read_preference = 'replica'
 
     queryset = JobTitle.objects.all()
     serializer_class = JobTitleSerializer
@@ -357,8 +443,10 @@ class JobTitleViewSet(viewsets.ModelViewSet):
 
 ### ОБЪЕКТЫ ###
 
-class ObjectViewSet(viewsets.ModelViewSet):
-    permission_classes = [IsSessionAuthenticated, roleRequiredPermissionFactory(['admin', 'foreman'])]
+class ObjectViewSet(InstrumentedViewSetMixin, ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'foreman']
+    read_preference = 'replica'
 
     queryset = Object.objects.all()
     serializer_class = ObjectSerializer
@@ -389,36 +477,167 @@ class ObjectViewSet(viewsets.ModelViewSet):
 
 ### МАТЕРИАЛЫ ###
 
-class MaterialViewSet(viewsets.ModelViewSet):
-    permission_classes = [IsSessionAuthenticated, roleRequiredPermissionFactory(['admin', 'storekeeper'])]
+class MaterialViewSet(InstrumentedViewSetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'storekeeper']
+    read_preference = 'replica'
     
-    queryset = Material.objects.all()
+    queryset = Material.objects.select_related('object')
     serializer_class = MaterialSerializer
 
+    # Добавление — это приход на объект: к существующему остатку прибавляется
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        material = serializer.save()
+        data = serializer.validated_data
+        if data['amount'] < 0:
+            return Response({'amount': ['Количество не может быть отрицательным']}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            record_movement(
+                MaterialMovement.KIND_RECEIPT, data['name'], data['amount'],
+                target=data['object'], user=request.my_user,
+            )
+        except StockError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        material = Material.objects.get(object=data['object'], name=data['name'])
         return Response({
             'message': 'Материал успешно добавлен',
             'id': material.id
         }, status=status.HTTP_201_CREATED)
 
+    # Остаток не перезаписывается, а корректируется движением на разницу.
+    # Объект и название меняются только у нулевого остатка (после корректировки)
     def update(self, request, *args, **kwargs):
-        kwargs['partial'] = True  # разрешаем частичное обновление
-        return super().update(request, *args, **kwargs)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.validated_data)
+        amount = data.pop('amount', None)
+        changes = {field: value for field, value in data.items() if getattr(instance, field) != value}
+
+        try:
+            with transaction.atomic():
+                if amount is not None:
+                    set_balance(instance, amount, user=request.my_user)
+                if changes:
+                    relabel_material(instance, **changes)
+        except IntegrityError:
+            return Response({'error': 'Такой материал на объекте уже есть'}, status=status.HTTP_400_BAD_REQUEST)
+        except StockError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': 'Материал успешно обновлён'})
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        self.perform_destroy(instance)
+        with transaction.atomic():
+            set_balance(instance, 0, user=request.my_user, comment='Удаление материала')
+            self.perform_destroy(instance)
         return Response({'message': 'Материал успешно удалён'}, status=status.HTTP_204_NO_CONTENT)
 
+    # Остаток по объекту и названию: ?object=<название объекта>&name=<материал>
+    @action(detail=False, methods=['get'])
+    def balance(self, request):
+        object_name = request.query_params.get('object')
+        name = request.query_params.get('name')
+        if not object_name or not name:
+            return Response({'error': 'Укажите object и name'}, status=status.HTTP_400_BAD_REQUEST)
+
+        amount = (
+            Material.objects
+            .filter(object__name=object_name, name=name)
+            .values_list('amount', flat=True)
+            .first()
+        )
+        return Response({'object': object_name, 'name': name, 'amount': str(amount) if amount is not None else '0.00'})
+
+    # Сводка остатков: ?groupBy=object,name (по умолчанию), ?below=<порог>
+    # для материалов на исходе, фильтры object и name
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        group_by = tuple(request.query_params.get('groupBy', 'object,name').split(','))
+        if not all(group in SUMMARY_GROUPS for group in group_by):
+            return Response({'error': 'groupBy: object и/или name'}, status=status.HTTP_400_BAD_REQUEST)
+
+        below = request.query_params.get('below')
+        if below:
+            try:
+                below = Decimal(below)
+                if not below.is_finite():
+                    raise InvalidOperation
+            except InvalidOperation:
+                return Response({'error': 'below должен быть числом'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            below = None
+
+        params = {
+            name: request.query_params[name]
+            for name in ('object', 'name') if request.query_params.get(name)
+        }
+        return Response(cached_material_summary(params, group_by, below))
+
+# Журнал движений материалов (приход, расход, перемещение, корректировка).
+# Записи не изменяются и не удаляются — история остаётся полной
+class MaterialMovementViewSet(InstrumentedViewSetMixin, StreamingListMixin,
+                              mixins.CreateModelMixin,
+                              mixins.ListModelMixin,
+                              mixins.RetrieveModelMixin,
+                              viewsets.GenericViewSet):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'storekeeper']
+    read_preference = 'replica'
+
+    queryset = MaterialMovement.objects.select_related('source', 'target', 'user')
+    serializer_class = MaterialMovementSerializer
+    cursor_ordering = ('-date', '-id')
+
+    # Фильтры: dateFrom, dateTo, object (источник или получатель), name
+    def get_queryset(self):
+        queryset = super().get_queryset().order_by('-date', '-id')
+        if self.action != 'list':
+            return queryset
+
+        params = self.request.query_params
+        queryset = filter_datetime_range(queryset, 'date', params)
+
+        object_name = params.get('object')
+        if object_name:
+            queryset = queryset.filter(Q(source__name=object_name) | Q(target__name=object_name))
+
+        name = params.get('name')
+        if name:
+            queryset = queryset.filter(name=name)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        try:
+            return super().list(request, *args, **kwargs)
+        except ValueError:
+            return Response({'error': DATE_FORMAT_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            movement = record_movement(
+                data['kind'], data['name'], data['amount'],
+                source=data.get('source'), target=data.get('target'),
+                user=request.my_user, comment=data.get('comment', ''),
+            )
+        except StockError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'message': 'Движение успешно записано', 'id': movement.id}, status=status.HTTP_201_CREATED)
+
 
 ### ЗАЯВКИ ###
 
 # Типы заявок
-class ClientsApplicationTypeViewSet(viewsets.ModelViewSet):
-    permission_classes = [IsSessionAuthenticated, roleRequiredPermissionFactory(['admin'])]
+class ClientsApplicationTypeViewSet(InstrumentedViewSetMixin, ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin']
+    read_preference = 'replica'
 
     queryset = ClientsApplicationType.objects.all()
     serializer_class = ClientsApplicationTypeSerializer
@@ -445,8 +664,10 @@ class ClientsApplicationTypeViewSet(viewsets.ModelViewSet):
         return Response({'message': 'Тип удалён'})
        
 # Статусы заявок
-class ClientsApplicationStatusViewSet(viewsets.ModelViewSet):
-    permission_classes = [IsSessionAuthenticated, roleRequiredPermissionFactory(['admin'])]
+class ClientsApplicationStatusViewSet(InstrumentedViewSetMixin, ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin']
+    read_preference = 'replica'
 
     queryset = ClientsApplicationStatus.objects.all()
     serializer_class = ClientsApplicationStatusSerializer
@@ -473,43 +694,74 @@ class ClientsApplicationStatusViewSet(viewsets.ModelViewSet):
         return Response({'message': 'Статус удалён'})
 
 # Заявки
-class ClientsApplicationViewSet(viewsets.ModelViewSet):
-    permission_classes = [IsSessionAuthenticated, roleRequiredPermissionFactory(['admin', 'marketer'])]
+class ClientsApplicationViewSet(InstrumentedViewSetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'marketer']
+    read_preference = 'replica'
 
-    queryset = ClientsApplication.objects.all()
+    queryset = ClientsApplication.objects.select_related('type', 'status')
     serializer_class = ClientsApplicationSerializer
+    cursor_ordering = ('-date', '-id')
+
+    # Поиск ?search= по ФИО, телефону и тексту заявки (см. search.py)
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        search = self.request.query_params.get('search', '').strip()
+        if search and self.action == 'list':
+            queryset = search_applications(queryset, search)
+        return queryset
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.request.query_params.get('search', '').strip():
+            self._paginator = SearchResultsPagination()
+        return super().paginator
 
     def get_permissions(self):
         if self.request.method == 'POST':
             # Создание заявки доступно всем
             return [AllowAny()]
         # Остальные действия — только для авторизованных с ролями
-        return [IsSessionAuthenticated(), roleRequiredPermissionFactory(['admin', 'marketer'])()]
+        return [IsSessionAuthenticated(), RolePermission()]
     
     def perform_create(self, serializer):
         # Если клиент не передал явно тип и статус — ставим значения по умолчанию
         if not self.request.data.get('type_name'):
             try:
-                type_obj = ClientsApplicationType.objects.get(name='Обратный звонок')
+                type_obj = lookups.application_types.get('Обратный звонок')
                 serializer.validated_data['type'] = type_obj
             except ClientsApplicationType.DoesNotExist:
                 raise ValidationError({'type': 'Тип "Обратный звонок" не найден'})
 
         if not self.request.data.get('status_name'):
             try:
-                status_obj = ClientsApplicationStatus.objects.get(name='Новая')
+                status_obj = lookups.application_statuses.get('Новая')
                 serializer.validated_data['status'] = status_obj
-            except:
+            except ClientsApplicationStatus.DoesNotExist:
                 raise ValidationError({'status': 'Статус "Новая" не найден'})
         
         serializer.save()
 
     def create(self, request, *args, **kwargs):
+        if buffered_intake():
+            return self.create_buffered(request)
+
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         return Response({'message': 'Заявка успешно создана'}, status=status.HTTP_201_CREATED)
 
+    # Режим очереди (APPLICATION_INTAKE_MODE=buffered): заявка проверяется
+    # без запросов к БД, пишется в очередь и подтверждается сразу (202)
+    def create_buffered(self, request):
+        submission, errors = validate_submission(request.data)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if not is_duplicate(submission):
+            enqueue_submission(submission)
+        return Response({'message': 'Заявка принята'}, status=status.HTTP_202_ACCEPTED)
+
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -524,19 +776,35 @@ class ClientsApplicationViewSet(viewsets.ModelViewSet):
         instance.delete()
         return Response({'message': 'Заявка удалена'})
 
+# Панель заявок: по статусам, типам, периодам и воронка (по сводке rollups.py)
+class ApplicationDashboardAPIView(APIView):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'marketer']
+    read_preference = 'replica'
+
+    def get(self, request):
+        period = request.query_params.get('period', 'day')
+        if period not in DASHBOARD_PERIODS:
+            return Response({'error': 'period: day, week или month'}, status=400)
+
+        try:
+            date_from, date_to = parse_date_range(request.query_params)
+        except ValueError:
+            return Response({'error': DATE_FORMAT_ERROR}, status=400)
+        return Response(application_dashboard(date_from, date_to, period))
+
 
 ### WTT ###
 
 # Отметка о начале работы
 class StartWorkAPIView(APIView):
-    permission_classes = [
-        IsSessionAuthenticated, 
-        roleRequiredPermissionFactory([
-            'admin', 'hr', 'marketer',
-            'foreman', 'storekeeper', 'basic'
-        ])
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = [
+        'admin', 'hr', 'marketer',
+        'foreman', 'storekeeper', 'basic'
     ]
 
+    @retry_on_locked
     def post(self, request):
         serializer = StartWorkSerializer(data=request.data)
         if not serializer.is_valid():
@@ -545,27 +813,28 @@ class StartWorkAPIView(APIView):
         employee = serializer.validated_data['personnelNumber']
         today = date.today()
 
-        if WorkTimeTracking.objects.filter(employee=employee, date=today).exists():
+        # Один INSERT: повторную отметку отсекает ограничение (employee, date)
+        try:
+            with transaction.atomic():
+                WorkTimeTracking.objects.create(
+                    employee=employee,
+                    date=today,
+                    startTime=datetime.now().time()
+                )
+        except IntegrityError:
             return Response({'error': 'Рабочий день уже начат'}, status=400)
 
-        WorkTimeTracking.objects.create(
-            employee=employee,
-            date=today,
-            startTime=datetime.now().time()
-        )
-
         return Response({'message': 'Начало рабочего дня зафиксировано'}, status=201)
 
 # Отметка о конце работы
 class EndWorkAPIView(APIView):
-    permission_classes = [
-        IsSessionAuthenticated, 
-        roleRequiredPermissionFactory([
-            'admin', 'hr', 'marketer',
-            'foreman', 'storekeeper', 'basic'
-        ])
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = [
+        'admin', 'hr', 'marketer',
+        'foreman', 'storekeeper', 'basic'
     ]
 
+    @retry_on_locked
     def post(self, request):
         serializer = EndWorkSerializer(data=request.data)
         if not serializer.is_valid():
@@ -574,23 +843,147 @@ class EndWorkAPIView(APIView):
         employee = serializer.validated_data['personnelNumber']
         today = date.today()
 
-        try:
-            tracking = WorkTimeTracking.objects.get(employee=employee, date=today)
-        except WorkTimeTracking.DoesNotExist:
+        # Один UPDATE только для незакрытого дня
+        updated = WorkTimeTracking.objects.filter(
+            employee=employee, date=today, endTime__isnull=True
+        ).update(endTime=datetime.now().time())
+
+        if not updated:
+            if WorkTimeTracking.objects.filter(employee=employee, date=today).exists():
+                return Response({'error': 'Рабочий день уже завершён'}, status=400)
             return Response({'error': 'Сначала отметьте начало рабочего дня'}, status=400)
+        invalidate_work_time([today])
 
-        if tracking.endTime:
-            return Response({'error': 'Рабочий день уже завершён'}, status=400)
+        return Response({'message': 'Конец рабочего дня зафиксирован'}, status=200)
 
-        tracking.endTime = datetime.now().time()
-        tracking.save()
+# Отметки для бригады: сотрудники выбираются одним запросом,
+# текущие отметки за сегодня — ещё одним, изменения — одной операцией
+class CrewWorkMixin:
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'foreman']
 
-        return Response({'message': 'Конец рабочего дня зафиксирован'}, status=200)
+    def get_crew(self, request):
+        serializer = CrewWorkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        queryset = Employee.objects.all()
+        if data.get('personnelNumbers'):
+            queryset = queryset.filter(personnelNumber__in=data['personnelNumbers'])
+        if data.get('object'):
+            queryset = queryset.filter(object__name=data['object'])
+        employees = list(queryset.only('id', 'personnelNumber'))
+
+        # Табельные номера из запроса, которых нет в выборке
+        found = {employee.personnelNumber for employee in employees}
+        missing = [number for number in data.get('personnelNumbers', []) if number not in found]
+        return employees, missing
+
+    def crew_response(self, employees, results, missing):
+        rows = [
+            {'personnelNumber': employee.personnelNumber, 'result': results[employee.id]}
+            for employee in employees
+        ]
+        rows += [{'personnelNumber': number, 'result': 'not_found'} for number in dict.fromkeys(missing)]
+        return Response({'results': rows})
+
+# Начало рабочего дня для бригады
+class CrewStartWorkAPIView(CrewWorkMixin, APIView):
+    @retry_on_locked
+    def post(self, request):
+        employees, missing = self.get_crew(request)
+        today = date.today()
+        now = datetime.now().time()
+
+        started = set(
+            WorkTimeTracking.objects
+            .filter(employee__in=employees, date=today)
+            .values_list('employee_id', flat=True)
+        )
+
+        results = {}
+        new_rows = []
+        for employee in employees:
+            if employee.id in started:
+                results[employee.id] = 'already_started'
+            else:
+                results[employee.id] = 'started'
+                new_rows.append(WorkTimeTracking(employee=employee, date=today, startTime=now))
+
+        if new_rows:
+            with transaction.atomic():
+                WorkTimeTracking.objects.bulk_create(new_rows, ignore_conflicts=True)
+                # Строки, которые успел вставить параллельный запрос, пропущены
+                # (ignore_conflicts) — свои узнаём по времени начала
+                inserted = set(
+                    WorkTimeTracking.objects
+                    .filter(employee__in=[row.employee_id for row in new_rows], date=today, startTime=now)
+                    .values_list('employee_id', flat=True)
+                )
+            for row in new_rows:
+                if row.employee_id not in inserted:
+                    results[row.employee_id] = 'already_started'
+            invalidate_work_time([today])
+
+        return self.crew_response(employees, results, missing)
+
+# Конец рабочего дня для бригады
+class CrewEndWorkAPIView(CrewWorkMixin, APIView):
+    @retry_on_locked
+    def post(self, request):
+        employees, missing = self.get_crew(request)
+        today = date.today()
+
+        end_times = dict(
+            WorkTimeTracking.objects
+            .filter(employee__in=employees, date=today)
+            .values_list('employee_id', 'endTime')
+        )
+
+        results = {}
+        open_ids = []
+        for employee in employees:
+            if employee.id not in end_times:
+                results[employee.id] = 'not_started'
+            elif end_times[employee.id] is not None:
+                results[employee.id] = 'already_finished'
+            else:
+                results[employee.id] = 'finished'
+                open_ids.append(employee.id)
+
+        if open_ids:
+            with transaction.atomic():
+                WorkTimeTracking.objects.filter(
+                    employee_id__in=open_ids, date=today, endTime__isnull=True
+                ).update(endTime=datetime.now().time())
+            invalidate_work_time([today])
+
+        return self.crew_response(employees, results, missing)
+
+# Синхронизация отметок, накопленных устройством без связи.
+# Пакет — JSON-массив или JSON Lines; повторы отсеиваются по clientEventId
+class SyncClockEventsAPIView(APIView):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = [
+        'admin', 'hr', 'marketer',
+        'foreman', 'storekeeper', 'basic'
+    ]
+    parser_classes = [JSONParser, JSONLinesParser]
+
+    @retry_on_locked
+    def post(self, request):
+        if not isinstance(request.data, list):
+            return Response({'error': 'Ожидается массив событий'}, status=400)
+        if len(request.data) > settings.CLOCK_SYNC_MAX_EVENTS:
+            return Response({'error': f'Не более {settings.CLOCK_SYNC_MAX_EVENTS} событий за запрос'}, status=400)
+        return Response(ingest_clock_events(request.data))
 
 # Обновление времени начала и/или конца рабочего дня сотрудника за сегодня
 class UpdateWorkTimeTrackingAPIView(APIView):
-    permission_classes = [IsSessionAuthenticated, roleRequiredPermissionFactory(['admin'])]
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin']
 
+    @retry_on_locked
     def put(self, request):
         personnel_number = request.data.get('personnelNumber')
         if not personnel_number:
@@ -614,8 +1007,10 @@ class UpdateWorkTimeTrackingAPIView(APIView):
 
 # Удаление записи о рабочем дне сотрудника по дате
 class DeleteWorkTimeTrackingAPIView(APIView):
-    permission_classes = [IsSessionAuthenticated, roleRequiredPermissionFactory(['admin'])]
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin']
     
+    @retry_on_locked
     def delete(self, request):
         personnel_number = request.data.get('personnelNumber')
         date_str = request.data.get('date')  # в формате 'YYYY-MM-DD'
@@ -633,41 +1028,145 @@ class DeleteWorkTimeTrackingAPIView(APIView):
         except Employee.DoesNotExist:
             return Response({'error': 'Сотрудник не найден'}, status=404)
 
-        tracking = WorkTimeTracking.objects.filter(employee=employee, date=date_obj).last()
-        if not tracking:
+        deleted, _ = WorkTimeTracking.objects.filter(employee=employee, date=date_obj).delete()
+        if not deleted:
             return Response({'error': 'Запись не найдена'}, status=404)
 
-        tracking.delete()
         return Response({'message': 'Запись удалена'}, status=204)
 
 class ListWorkTimeTrackingAPIView(APIView):
-    permission_classes = [
-        IsSessionAuthenticated, 
-        roleRequiredPermissionFactory([
-            'admin', 'hr', 'marketer',
-            'foreman', 'storekeeper', 'basic'
-        ])
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = [
+        'admin', 'hr', 'marketer',
+        'foreman', 'storekeeper', 'basic'
     ]
+    read_preference = 'replica'
+    query_budget = 3
+
+    def get(self, request):
+        try:
+            queryset = filter_work_time_list(WorkTimeTracking.objects.all(), request.query_params)
+        except ValueError:
+            return Response({'error': DATE_FORMAT_ERROR}, status=400)
+
+        rows = work_time_list_values(queryset.order_by('id'))
+        if stream_requested(request):
+            return StreamingJSONResponse(iterate_queryset(rows))
+        return Response(list(rows))
+
+# Отчёт по отработанным часам: длительность, итоги, опоздания и незакрытые смены
+# с группировкой по сотруднику/объекту и периоду (день, неделя, месяц)
+class WorkTimeReportAPIView(APIView):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'hr']
+    read_preference = 'replica'
+
+    filter_params = ('personnelNumber', 'object', 'dateFrom', 'dateTo')
+
+    def get(self, request):
+        period = request.query_params.get('period', 'day')
+        if period not in REPORT_PERIODS:
+            return Response({'error': 'period: day, week или month'}, status=400)
+
+        group_by = tuple(request.query_params.get('groupBy', 'employee').split(','))
+        if not all(group in REPORT_GROUPS for group in group_by):
+            return Response({'error': 'groupBy: employee и/или object'}, status=400)
+
+        params = {
+            name: request.query_params[name]
+            for name in self.filter_params if request.query_params.get(name)
+        }
+        try:
+            report = cached_hours_report(params, period, group_by)
+        except ValueError:
+            return Response({'error': DATE_FORMAT_ERROR}, status=400)
+        return Response(report)
+
+
+### ВЫГРУЗКИ ###
+
+# Табель учёта времени (CSV/XLSX) по сотруднику, объекту и периоду.
+# Небольшой CSV отдаётся потоком сразу, XLSX и большие выгрузки
+# выполняются в фоне (ответ 202 со ссылкой на статус)
+class TimesheetExportAPIView(APIView):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'hr']
+    read_preference = 'replica'
+
+    filter_params = ('personnelNumber', 'object', 'dateFrom', 'dateTo')
 
     def get(self, request):
-        full_name = request.query_params.get('fullName')
-        personnel_number = request.query_params.get('personnelNumber')
+        export_format = request.query_params.get('fileFormat', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': 'Формат выгрузки: csv или xlsx'}, status=400)
+        if export_format == 'xlsx' and not xlsx_available():
+            return Response({'error': 'Выгрузка в XLSX недоступна: не установлен openpyxl'}, status=400)
+
+        params = {
+            name: request.query_params[name]
+            for name in self.filter_params if request.query_params.get(name)
+        }
+        try:
+            parse_date_range(params)
+        except ValueError:
+            return Response({'error': DATE_FORMAT_ERROR}, status=400)
 
-        queryset = WorkTimeTracking.objects.all()
+        background = (
+            export_format != 'csv'
+            or request.query_params.get('background') in ('1', 'true')
+            or timesheet_queryset(params).count() > settings.EXPORT_SYNC_ROW_LIMIT
+        )
+        if not background:
+            return csv_streaming_response(timesheet_header(), timesheet_rows(params), 'timesheet.csv')
+
+        job = start_export_job('timesheet', export_format, params, user=request.my_user)
+        return Response(export_job_data(job), status=status.HTTP_202_ACCEPTED)
+
+def export_job_data(job):
+    data = {
+        'id': job.id,
+        'status': job.status,
+        'format': job.format,
+        'rows': job.rows,
+        'error': job.error,
+        'url': f'/api/wtt/export/{job.id}/',
+    }
+    if job.status == ExportJob.STATUS_DONE:
+        data['download'] = f'/api/wtt/export/{job.id}/download/'
+    return data
+
+# Статус фоновой выгрузки (только своей)
+class ExportJobAPIView(APIView):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'hr']
+
+    def get(self, request, job_id):
+        try:
+            job = ExportJob.objects.get(id=job_id, user=request.my_user)
+        except ExportJob.DoesNotExist:
+            return Response({'error': 'Выгрузка не найдена'}, status=404)
+        return Response(export_job_data(job))
 
-        if personnel_number:
-            queryset = queryset.filter(employee__personnelNumber=personnel_number)
+# Скачивание готовой выгрузки (только своей)
+class ExportJobDownloadAPIView(APIView):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin', 'hr']
 
-        if full_name:
-            queryset = queryset.filter(employee__fullName__icontains=full_name)
+    def get(self, request, job_id):
+        try:
+            job = ExportJob.objects.get(id=job_id, user=request.my_user, status=ExportJob.STATUS_DONE)
+            file = open(job.file, 'rb')
+        except (ExportJob.DoesNotExist, FileNotFoundError):
+            return Response({'error': 'Выгрузка не найдена или ещё не готова'}, status=404)
+        return FileResponse(file, as_attachment=True, filename=f'{job.kind}.{job.format}')
 
-        serializer = WorkTimeTrackingSerializer(queryset, many=True)
-        return Response(serializer.data)
 
 ### Роли ###
 
-class RoleViewSet(viewsets.ModelViewSet):
-    permission_classes = [IsSessionAuthenticated, roleRequiredPermissionFactory(['admin'])]
+class RoleViewSet(InstrumentedViewSetMixin, ConditionalGetMixin, StreamingListMixin, viewsets.ModelViewSet):
+    permission_classes = [IsSessionAuthenticated, RolePermission]
+    allowed_roles = ['admin']
+    read_preference = 'replica'
 
     queryset = Role.objects.all()
     serializer_class = RoleSerializer